@@ -1,6 +1,14 @@
+import argparse
+
+import chess.engine as engine
 import chess.model as model
 import chess.view as view
 
+parser = argparse.ArgumentParser(prog='python -m chess')
+parser.add_argument('--computer', choices=['white', 'black'], help='let the computer play this side')
+parser.add_argument('--think', type=float, default=2.0, help='seconds the computer may think per move')
+args = parser.parse_args()
+
 # Instructions for the player
 instructions = """
 Welcome to Python Chess by Team One!
@@ -11,6 +19,7 @@ Instructions:
 - For pawn promotion, enter the move followed by the piece you want to promote to (e.g., 'e7e8Q' for Queen, 'R' for Rook, 'B' for Bishop, 'N' for Knight).
 - Enter 'u' or 'backup' to undo the last move.
 - Enter 'q' to quit the game.
+- Start with '--computer white' or '--computer black' to play against the computer.
 
 White begins the game.
 """
@@ -24,7 +33,16 @@ while not game.game_over:
     print("")
     print(view.board_to_text(game.board))
     prompt = "White to play:" if game.white_to_play else "Black to play:"
-    move = input(prompt).lower()  # Convert input to lowercase for consistency
+    if args.computer is not None and game.white_to_play == (args.computer == 'white'):
+        result = engine.search(game, time_limit=args.think)
+        move = result.move
+        if move is None:
+            print("No legal moves left: the game is a draw.")
+            game.game_over = True
+            continue
+        print(f"{prompt} {move}")
+    else:
+        move = input(prompt).lower()  # Convert input to lowercase for consistency
 
     # Handle special commands
     if move == 'u' or move == 'backup':
@@ -38,14 +56,21 @@ while not game.game_over:
     # Process a regular move
     try:
         game.accept_move(move)
-        # Check for checkmate immediately after the move
-        if game.is_checkmate(game.white_to_play):
-            # print the board after checkmate
+        # Check whether the game is over immediately after the move
+        status = game.status()
+        if status != 'ongoing':
+            # print the final board
             print("")
             print(view.board_to_text(game.board))
             game.game_over = True
-            winner = "White" if not game.white_to_play else "Black"
-            print(f"Checkmate, {winner} Wins!")
+            if status == 'checkmate':
+                winner = "White" if not game.white_to_play else "Black"
+                print(f"Checkmate, {winner} Wins!")
+            else:
+                reason = {'stalemate': "stalemate",
+                          'fifty-move': "fifty moves without a capture or pawn move",
+                          'repetition': "threefold repetition"}[status]
+                print(f"The game is a draw by {reason}.")
     except Exception as e:  # Catch the exception to provide feedback
         print(f"You made an illegal move: {e}, please try again")
         continue
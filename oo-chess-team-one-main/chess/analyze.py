@@ -0,0 +1,130 @@
+"""Parallel move-tree analysis across worker processes.
+
+The tree below a position is split into the subtrees after its first few
+plies. Each subtree is sent to a worker process as a Game.snapshot() tuple
+and the counts that come back are merged per root move. Run from the
+command line with:
+
+    python -m chess.analyze --workers 8 --depth 5
+    python -m chess.analyze --workers 8 --depth 4 --position kiwipete --mates
+"""
+import argparse
+import concurrent.futures
+import os
+import time
+
+import chess.model as model
+import chess.perft as perft
+
+# Subtree counts in 'mates' mode: leaf nodes, leaves in check, leaves in checkmate
+NODES, CHECKS, CHECKMATES = range(3)
+
+
+def _count_mates(game, depth):
+    # [nodes, checks, checkmates] over the positions exactly 'depth' plies below 'game'
+    if depth == 0:
+        white = game.white_to_play
+        if not game.is_check(white):
+            return [1, 0, 0]
+        return [1, 1, 0 if game.has_legal_move(white) else 1]
+    totals = [0, 0, 0]
+    for move in game.legal_moves():
+        game._make(move)
+        counts = _count_mates(game, depth - 1)
+        game._unmake()
+        totals[NODES] += counts[NODES]
+        totals[CHECKS] += counts[CHECKS]
+        totals[CHECKMATES] += counts[CHECKMATES]
+    return totals
+
+
+def _analyze_subtree(task):
+    # Worker entry point: task is (snapshot, depth, mates, bitboards)
+    snapshot, depth, mates, bitboards = task
+    game = model.Game.from_snapshot(snapshot, bitboards)
+    if mates:
+        return _count_mates(game, depth)
+    return [perft.perft(game, depth), 0, 0]
+
+
+def _split(game, plies, line=()):
+    # Yield (root move, snapshot) for every position 'plies' moves below 'game'
+    if plies == 0:
+        yield line[0], game.snapshot()
+        return
+    for move in game.legal_moves():
+        game._make(move)
+        yield from _split(game, plies - 1, line or (model.move_text(move),))
+        game._unmake()
+
+
+def analyze(game, depth, workers=None, split_depth=2, mates=False, bitboards=False):
+    """
+    Count the nodes 'depth' plies below the game's position, using 'workers'
+    processes (default: one per CPU). With 'mates', also count the leaves in check
+    and in checkmate. Returns {root move: [nodes, checks, checkmates]}, with moves
+    written like 'e2e4'; without 'mates' the last two counts are 0.
+    """
+    if depth < 1:
+        raise ValueError('depth must be at least 1')
+    split_depth = max(1, min(split_depth, depth))
+    game = model.Game.from_snapshot(game.snapshot(), bitboards)
+    # a root move whose line ends in mate or stalemate before the split yields no task
+    root_moves = [model.move_text(move) for move in game.legal_moves()]
+    roots = []
+    tasks = []
+    for root, snapshot in _split(game, split_depth):
+        roots.append(root)
+        tasks.append((snapshot, depth - split_depth, mates, bitboards))
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        results = map(_analyze_subtree, tasks)
+        return _merge(root_moves, roots, results)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # several subtrees per round trip keeps the pickling overhead small
+        chunksize = max(1, len(tasks) // (workers * 8))
+        return _merge(root_moves, roots, executor.map(_analyze_subtree, tasks, chunksize=chunksize))
+
+
+def _merge(root_moves, roots, results):
+    merged = {root: [0, 0, 0] for root in root_moves}
+    for root, counts in zip(roots, results):
+        totals = merged[root]
+        for i, count in enumerate(counts):
+            totals[i] += count
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.analyze', description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--position', default='start', choices=sorted(perft.POSITIONS))
+    parser.add_argument('--split', type=int, default=2, help='plies to expand before handing subtrees to workers')
+    parser.add_argument('--mates', action='store_true', help='also count checks and checkmates at the leaves')
+    parser.add_argument('--divide', action='store_true', help='show the counts below each root move')
+    parser.add_argument('--bitboards', action='store_true', help='use the bitboard backend')
+    args = parser.parse_args(argv)
+
+    game = perft.position(args.position)
+    start = time.perf_counter()
+    results = analyze(game, args.depth, args.workers, args.split, args.mates, args.bitboards)
+    elapsed = time.perf_counter() - start
+
+    print(f'{args.position}, depth {args.depth}')
+    if args.divide:
+        for move, counts in sorted(results.items()):
+            print(f'  {move}: ' + (' '.join(map(str, counts)) if args.mates else str(counts[NODES])))
+    totals = [sum(counts[i] for counts in results.values()) for i in (NODES, CHECKS, CHECKMATES)]
+    rate = totals[NODES] / elapsed if elapsed > 0 else float('inf')
+    line = f'nodes: {totals[NODES]}'
+    if args.mates:
+        line += f'  checks: {totals[CHECKS]}  checkmates: {totals[CHECKMATES]}'
+    print(f'{line}  time: {elapsed:.3f}s  nodes/s: {rate:.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,385 @@
+"""Bitboard backend for move generation.
+
+A BitboardBoard keeps, next to the 0x88 array of its Board base class, one
+64-bit occupancy mask per piece code. Bit n of a mask stands for square n in
+a1=0, b1=1, ..., h8=63 order. Knight, king and pawn attacks come from
+precomputed tables. Rook, bishop and queen attacks are looked up too: the
+occupancy of each line through a square (its rank, file and two diagonals)
+is folded into an 8-bit index with a shift or a multiply, and a table per
+square and line gives the attacked squares for every such index.
+
+Legal moves are generated with check and pin masks worked out once per
+position, so only king steps and en passant captures need an attack test.
+"""
+from array import array
+
+from chess.model import (
+    Board, SQUARES, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK,
+    MOVE_EN_PASSANT, MOVE_PROMOTION,
+)
+
+# 0x88 index of each of the 64 squares, and the reverse mapping
+SQ88 = SQUARES
+SQ64 = {sq: i for i, sq in enumerate(SQ88)}
+
+FULL = (1 << 64) - 1
+_A_FILE = 0x0101010101010101
+
+
+def _bit(file, rank):
+    if 0 <= file < 8 and 0 <= rank < 8:
+        return 1 << (rank * 8 + file)
+    return 0
+
+
+def _leaper_table(offsets):
+    table = []
+    for sq in range(64):
+        file, rank = sq & 7, sq >> 3
+        mask = 0
+        for df, dr in offsets:
+            mask |= _bit(file + df, rank + dr)
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table(((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+KING_ATTACKS = _leaper_table(((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)))
+# PAWN_ATTACKS[0] are the squares a white pawn attacks, PAWN_ATTACKS[1] a black pawn's
+PAWN_ATTACKS = (_leaper_table(((-1, 1), (1, 1))), _leaper_table(((-1, -1), (1, -1))))
+
+# The four lines through a square. rook_attacks and bishop_attacks fold the
+# occupancy of a line into 8 bits, with the square on file f (or, for the file
+# itself, on rank r) landing on bit f (or 7 - r). The multiplies add shifted
+# copies of the line that never overlap, so each square's bit arrives in the
+# top byte.
+_RANK, _FILE, _DIAGONAL, _ANTI_DIAGONAL = range(4)
+_LINE_STEPS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+def _line_squares(sq, line):
+    # The squares of the line through sq, from one board edge to the other
+    df, dr = _LINE_STEPS[line]
+    file, rank = sq & 7, sq >> 3
+    while 0 <= file - df < 8 and 0 <= rank - dr < 8:
+        file, rank = file - df, rank - dr
+    squares = []
+    while 0 <= file < 8 and 0 <= rank < 8:
+        squares.append(rank * 8 + file)
+        file, rank = file + df, rank + dr
+    return squares
+
+
+def _index_bit(sq, line):
+    return 7 - (sq >> 3) if line == _FILE else sq & 7
+
+
+def _slide(position, occupied):
+    # Bits of the 8-square line a slider on 'position' reaches, given the line occupancy
+    attacks = 0
+    for step in (1, -1):
+        at = position + step
+        while 0 <= at < 8:
+            attacks |= 1 << at
+            if occupied >> at & 1:
+                break
+            at += step
+    return attacks
+
+
+_SLIDES = [[_slide(position, occupied) for occupied in range(256)] for position in range(8)]
+
+
+def _line_tables(line):
+    # For each square, the attacks along the line for every 8-bit line index
+    tables = []
+    spread_cache = {}
+    for sq in range(64):
+        squares = tuple(_line_squares(sq, line))
+        spread = spread_cache.get(squares)
+        if spread is None:
+            # map each 8-bit pattern back to the squares of this line
+            bits = [0] * 8
+            for line_sq in squares:
+                bits[_index_bit(line_sq, line)] = 1 << line_sq
+            spread = spread_cache[squares] = [
+                sum(bits[i] for i in range(8) if pattern >> i & 1) for pattern in range(256)]
+        tables.append([spread[pattern] for pattern in _SLIDES[_index_bit(sq, line)]])
+    return tables
+
+
+_LINE_MASKS = [[sum(1 << s for s in _line_squares(sq, line)) for sq in range(64)] for line in range(4)]
+_RANK_ATTACKS, _FILE_ATTACKS, _DIAGONAL_ATTACKS, _ANTI_DIAGONAL_ATTACKS = (
+    _line_tables(line) for line in range(4))
+_DIAGONAL_MASKS = _LINE_MASKS[_DIAGONAL]
+_ANTI_DIAGONAL_MASKS = _LINE_MASKS[_ANTI_DIAGONAL]
+
+
+def rook_attacks(sq, occupied):
+    return (_RANK_ATTACKS[sq][occupied >> (sq & 56) & 255]
+            | _FILE_ATTACKS[sq][((occupied >> (sq & 7)) & _A_FILE) * 0x8040201008040201 >> 56 & 255])
+
+
+def bishop_attacks(sq, occupied):
+    return (_DIAGONAL_ATTACKS[sq][(occupied & _DIAGONAL_MASKS[sq]) * _A_FILE >> 56 & 255]
+            | _ANTI_DIAGONAL_ATTACKS[sq][(occupied & _ANTI_DIAGONAL_MASKS[sq]) * _A_FILE >> 56 & 255])
+
+
+def queen_attacks(sq, occupied):
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+def _between_table():
+    # _BETWEEN[a][b]: the squares strictly between a and b if they share a line, else 0
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        file, rank = sq & 7, sq >> 3
+        for df, dr in _LINE_STEPS + tuple((-df, -dr) for df, dr in _LINE_STEPS):
+            between = 0
+            step = 1
+            while _bit(file + df * step, rank + dr * step):
+                to = (rank + dr * step) * 8 + file + df * step
+                table[sq][to] = between
+                between |= 1 << to
+                step += 1
+    return table
+
+
+_BETWEEN = _between_table()
+_EMPTY_ROOK = [rook_attacks(sq, 0) for sq in range(64)]
+_EMPTY_BISHOP = [bishop_attacks(sq, 0) for sq in range(64)]
+
+
+def _squares_of(mask):
+    # Yield the square number of every set bit, lowest first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardBoard(Board):
+    """Board that also keeps one occupancy bitboard per piece code."""
+    __slots__ = ('bitboards', 'occupancy')
+
+    def __init__(self):
+        super().__init__()
+        # bitboards[code] for every piece code, occupancy[0] white, occupancy[1] black
+        self.bitboards = [0] * 16
+        self.occupancy = [0, 0]
+
+    def place(self, sq: int, code: int):
+        old = self._squares[sq]
+        bit = 1 << SQ64[sq]
+        if old:
+            self.bitboards[old] ^= bit
+            self.occupancy[old >> 3] ^= bit
+        if code:
+            self.bitboards[code] ^= bit
+            self.occupancy[code >> 3] ^= bit
+        super().place(sq, code)
+
+    def deep_copy(self):
+        new_board = BitboardBoard()
+        new_board._squares = bytearray(self._squares)
+        new_board.zobrist = self.zobrist
+        new_board._kings = self._kings[:]
+        new_board.bitboards = self.bitboards[:]
+        new_board.occupancy = self.occupancy[:]
+        return new_board
+
+    def is_attacked(self, sq, by_white):
+        return self.attacked(SQ64[sq], by_white)
+
+    def attacked(self, sq, by_white, occupied=None, exclude=0):
+        """
+        Is the square (0..63) attacked by the given colour? 'occupied' overrides the
+        board occupancy and pieces on the 'exclude' mask are ignored as attackers,
+        which lets callers ask the question for a position after a move without
+        making it.
+        """
+        return bool(self.attackers(sq, by_white, occupied, exclude))
+
+    def attackers(self, sq, by_white, occupied=None, exclude=0):
+        """Return the mask of the given colour's pieces attacking the square (0..63)."""
+        bbs = self.bitboards
+        colour = 0 if by_white else BLACK
+        if occupied is None:
+            occupied = self.occupancy[0] | self.occupancy[1]
+        queens = bbs[QUEEN | colour]
+        # a pawn of the attacking colour attacks sq from where a defending pawn on sq would attack
+        found = ((KNIGHT_ATTACKS[sq] & bbs[KNIGHT | colour])
+                 | (KING_ATTACKS[sq] & bbs[KING | colour])
+                 | (PAWN_ATTACKS[by_white][sq] & bbs[PAWN | colour]))
+        rooks = bbs[ROOK | colour] | queens
+        if rooks & _EMPTY_ROOK[sq]:
+            found |= rook_attacks(sq, occupied) & rooks
+        bishops = bbs[BISHOP | colour] | queens
+        if bishops & _EMPTY_BISHOP[sq]:
+            found |= bishop_attacks(sq, occupied) & bishops
+        return found & ~exclude
+
+    def in_check(self, is_white):
+        kings = self.bitboards[KING | (0 if is_white else BLACK)]
+        if not kings:
+            return False
+        return self.attacked((kings & -kings).bit_length() - 1, not is_white)
+
+    def pseudo_legal_moves(self, is_white, ep_square=None):
+        """
+        Yield (from, to) pairs of 0..63 squares for every pseudo-legal move except
+        castling. 'ep_square' is the 0..63 en passant target square, if any.
+        """
+        bbs = self.bitboards
+        colour = 0 if is_white else BLACK
+        side = colour >> 3
+        own = self.occupancy[side]
+        enemy = self.occupancy[side ^ 1]
+        occupied = own | enemy
+        targets = ~own
+        pawn_targets = enemy
+        if ep_square is not None:
+            pawn_targets |= 1 << ep_square
+
+        for sq in _squares_of(bbs[PAWN | colour]):
+            if is_white:
+                one, start_rank = sq + 8, 1
+            else:
+                one, start_rank = sq - 8, 6
+            if 0 <= one < 64 and not occupied >> one & 1:
+                yield sq, one
+                two = one + one - sq
+                if sq >> 3 == start_rank and not occupied >> two & 1:
+                    yield sq, two
+            for to in _squares_of(PAWN_ATTACKS[side][sq] & pawn_targets):
+                yield sq, to
+        for sq in _squares_of(bbs[KNIGHT | colour]):
+            for to in _squares_of(KNIGHT_ATTACKS[sq] & targets):
+                yield sq, to
+        for sq in _squares_of(bbs[BISHOP | colour]):
+            for to in _squares_of(bishop_attacks(sq, occupied) & targets):
+                yield sq, to
+        for sq in _squares_of(bbs[ROOK | colour]):
+            for to in _squares_of(rook_attacks(sq, occupied) & targets):
+                yield sq, to
+        for sq in _squares_of(bbs[QUEEN | colour]):
+            for to in _squares_of(queen_attacks(sq, occupied) & targets):
+                yield sq, to
+        for sq in _squares_of(bbs[KING | colour]):
+            for to in _squares_of(KING_ATTACKS[sq] & targets):
+                yield sq, to
+
+    def legal_moves(self, is_white, ep_square=None):
+        """
+        Return an array('H') of packed moves (see model.pack_move) for every legal
+        move of the given colour except castling, which depends on the game's
+        castling rights. 'ep_square' is a 0x88 index.
+
+        The checkers and pinned pieces are found first. A piece then only goes
+        to squares that capture the checker or block its ray, and a pinned piece
+        only along its pin, so just the king's steps and en passant captures are
+        tested against the enemy attacks.
+        """
+        bbs = self.bitboards
+        colour = 0 if is_white else BLACK
+        enemy_colour = colour ^ BLACK
+        side = colour >> 3
+        own = self.occupancy[side]
+        enemy = self.occupancy[side ^ 1]
+        occupied = own | enemy
+        moves = array('H')
+        append = moves.append
+        if ep_square is not None:
+            ep_square = SQ64[ep_square]
+            # only a real en passant target: the pawn that skipped it is still beside it
+            if not bbs[PAWN | enemy_colour] >> (ep_square - 8 if is_white else ep_square + 8) & 1:
+                ep_square = None
+
+        kings = bbs[KING | colour]
+        if not kings:
+            # without a king to protect every move is legal
+            pawns = bbs[PAWN | colour]
+            last_rank = 7 if is_white else 0
+            for frm, to in self.pseudo_legal_moves(is_white, ep_square):
+                self._append(append, frm, to, pawns >> frm & 1, last_rank, ep_square)
+            return moves
+        king_sq = (kings & -kings).bit_length() - 1
+
+        # The king steps to squares the enemy does not attack, with the king itself
+        # taken off the board so it does not hide the squares behind it on a ray.
+        without_king = occupied ^ kings
+        attacked = self.attacked
+        for to in _squares_of(KING_ATTACKS[king_sq] & ~own):
+            if not attacked(to, not is_white, without_king):
+                append(king_sq | to << 6)
+
+        checkers = self.attackers(king_sq, not is_white, occupied)
+        if checkers & (checkers - 1):
+            # double check: only the king can move
+            return moves
+        targets = ~own & FULL
+        if checkers:
+            targets &= _BETWEEN[king_sq][checkers.bit_length() - 1] | checkers
+
+        # A piece is pinned when it is the only piece between the king and an
+        # enemy slider on the same line; it may then only move along that line.
+        queens = bbs[QUEEN | enemy_colour]
+        pins = {}
+        snipers = ((_EMPTY_ROOK[king_sq] & (bbs[ROOK | enemy_colour] | queens))
+                   | (_EMPTY_BISHOP[king_sq] & (bbs[BISHOP | enemy_colour] | queens)))
+        for sniper in _squares_of(snipers):
+            between = _BETWEEN[king_sq][sniper]
+            blockers = between & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pins[blockers] = between | 1 << sniper
+        pinned = sum(pins)
+
+        for sq in _squares_of(bbs[KNIGHT | colour] & ~pinned):
+            for to in _squares_of(KNIGHT_ATTACKS[sq] & targets):
+                append(sq | to << 6)
+        for code, attacks in ((BISHOP, bishop_attacks), (ROOK, rook_attacks), (QUEEN, queen_attacks)):
+            for sq in _squares_of(bbs[code | colour]):
+                reach = attacks(sq, occupied) & targets
+                if pinned >> sq & 1:
+                    reach &= pins[1 << sq]
+                for to in _squares_of(reach):
+                    append(sq | to << 6)
+
+        pawns = bbs[PAWN | colour]
+        if is_white:
+            forward, start_rank, last_rank = 8, 1, 7
+        else:
+            forward, start_rank, last_rank = -8, 6, 0
+        pawn_attacks = PAWN_ATTACKS[side]
+        for sq in _squares_of(pawns):
+            allowed = targets & pins[1 << sq] if pinned >> sq & 1 else targets
+            one = sq + forward
+            if 0 <= one < 64 and not occupied >> one & 1:
+                if allowed >> one & 1:
+                    self._append(append, sq, one, True, last_rank, None)
+                two = one + forward
+                if sq >> 3 == start_rank and not occupied >> two & 1 and allowed >> two & 1:
+                    append(sq | two << 6)
+            for to in _squares_of(pawn_attacks[sq] & enemy & allowed):
+                self._append(append, sq, to, True, last_rank, None)
+        if ep_square is not None:
+            # The capture empties two squares of a rank at once, which the pin
+            # masks do not cover, so test the king in the position it leaves.
+            captured = 1 << (ep_square - forward)
+            for sq in _squares_of(PAWN_ATTACKS[side ^ 1][ep_square] & pawns):
+                after = occupied ^ (1 << sq) ^ captured | 1 << ep_square
+                if not attacked(king_sq, not is_white, after, captured):
+                    append(sq | ep_square << 6 | MOVE_EN_PASSANT)
+        return moves
+
+    @staticmethod
+    def _append(append, frm, to, is_pawn, last_rank, ep_square):
+        # bit indices are the packed move's square numbers
+        move = frm | to << 6
+        if is_pawn and to >> 3 == last_rank:
+            for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                append(move | MOVE_PROMOTION | (kind - KNIGHT) << 12)
+        elif is_pawn and to == ep_square:
+            append(move | MOVE_EN_PASSANT)
+        else:
+            append(move)
@@ -0,0 +1,168 @@
+"""Polyglot opening book lookup.
+
+A Polyglot book is a file of 16 byte big-endian entries (position key, move,
+weight, learn value) sorted by key. Book maps the file with mmap and finds a
+position's entries by binary search, so opening a book costs nothing up front
+and worker processes share its pages through the page cache.
+
+Keys are computed from a table of 781 random numbers laid out as Polyglot
+specifies. By default that is the standard Polyglot Random64 table, which is
+also model.ZOBRIST_RANDOMS, so a position's book key is its Game.position_key
+and books made by other Polyglot tools can be read as they are. A different
+table can be loaded with load_randoms() and passed as 'randoms'.
+"""
+from collections import namedtuple
+import mmap
+import os
+import random
+import struct
+
+import chess.model as model
+from chess.model import (
+    SQUARES, EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, KIND_MASK, OFF_BOARD,
+)
+
+# 'move' is written like 'e2e4' and 'e7e8q', the way Game.accept_move reads it
+BookEntry = namedtuple('BookEntry', 'move weight learn')
+
+_ENTRY = struct.Struct('>QHHI')
+_KEY = struct.Struct('>Q')
+_RANDOMS = struct.Struct('>781Q')
+
+# Promotion piece numbers of the Polyglot move encoding
+_PROMOTION_KINDS = (EMPTY, KNIGHT, BISHOP, ROOK, QUEEN)
+
+
+def load_randoms(path):
+    """Read a table of 781 keys stored as big-endian 64-bit numbers."""
+    with open(path, 'rb') as f:
+        return _RANDOMS.unpack(f.read(_RANDOMS.size))
+
+
+def polyglot_key(game, randoms=None):
+    """Return the Polyglot key of the game's position, using 'randoms' for the keys."""
+    if randoms is None or randoms is model.ZOBRIST_RANDOMS:
+        return game.position_key
+    squares = game.board._squares
+    key = 0
+    for sq in SQUARES:
+        code = squares[sq]
+        if code:
+            key ^= randoms[64 * (2 * ((code & KIND_MASK) - 1) + (not code & BLACK)) + (sq >> 4) * 8 + (sq & 7)]
+    for bit in range(4):
+        if game.castling >> bit & 1:
+            key ^= randoms[768 + bit]
+    ep = game.ep_square
+    if ep is not None:
+        pawn, behind = (PAWN, ep - 16) if game.white_to_play else (PAWN | BLACK, ep + 16)
+        if any(not sq & OFF_BOARD and squares[sq] == pawn for sq in (behind - 1, behind + 1)):
+            key ^= randoms[772 + (ep & 7)]
+    if game.white_to_play:
+        key ^= randoms[780]
+    return key
+
+
+def decode_move(game, raw):
+    """Convert a Polyglot move for the game's position into accept_move form."""
+    to_sq = (raw >> 3 & 7) * 16 + (raw & 7)
+    from_sq = (raw >> 9 & 7) * 16 + (raw >> 6 & 7)
+    promotion = _PROMOTION_KINDS[raw >> 12 & 7]
+    squares = game.board._squares
+    king = squares[from_sq]
+    if king & KIND_MASK == KING and squares[to_sq] == ROOK | (king & BLACK):
+        # Polyglot writes castling as the king taking its own rook
+        to_sq = from_sq + 2 if to_sq > from_sq else from_sq - 2
+    return model.move_text(model.pack_move(from_sq, to_sq, promotion))
+
+
+def encode_move(game, move):
+    """Convert a move in accept_move form into the Polyglot encoding."""
+    from_sq, to_sq = model.square(move[:2]), model.square(move[2:4])
+    promotion = _PROMOTION_KINDS.index(model._PROMOTIONS[move[4].lower()]) if len(move) > 4 else 0
+    if game.board.code_at(from_sq) & KIND_MASK == KING and abs(to_sq - from_sq) == 2:
+        to_sq = to_sq | 7 if to_sq > from_sq else to_sq & 0x70
+    return promotion << 12 | (from_sq >> 4) << 9 | (from_sq & 7) << 6 | (to_sq >> 4) << 3 | (to_sq & 7)
+
+
+def write_book(path, entries, randoms=None):
+    """
+    Write a book from (game, move, weight) triples, with moves in accept_move
+    form. Entries are sorted by key as Polyglot requires; the learn values are 0.
+    """
+    records = sorted((polyglot_key(game, randoms), encode_move(game, move), weight, 0)
+                     for game, move, weight in entries)
+    with open(path, 'wb') as f:
+        for record in records:
+            f.write(_ENTRY.pack(*record))
+
+
+class Book:
+    """A Polyglot book file, mapped into memory."""
+
+    def __init__(self, path, randoms=None):
+        self.path = path
+        self.randoms = randoms
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._count = size // _ENTRY.size
+
+    def __len__(self):
+        return self._count
+
+    def _first(self, key):
+        # Index of the first entry whose key is not below 'key'
+        low, high = 0, self._count
+        data = self._map
+        while low < high:
+            middle = (low + high) >> 1
+            if _KEY.unpack_from(data, middle * 16)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, game):
+        """Return the BookEntry list for the game's position, highest weight first."""
+        key = polyglot_key(game, self.randoms)
+        data = self._map
+        found = []
+        index = self._first(key)
+        while index < self._count:
+            entry_key, raw, weight, learn = _ENTRY.unpack_from(data, index * 16)
+            if entry_key != key:
+                break
+            found.append(BookEntry(decode_move(game, raw), weight, learn))
+            index += 1
+        found.sort(key=lambda entry: entry.weight, reverse=True)
+        return found
+
+    def pick(self, game, weighted=False, rng=random):
+        """
+        Return a book move for the game's position, or None when it is not in the
+        book. Without 'weighted' the move with the highest weight is chosen;
+        otherwise a move is drawn at random in proportion to its weight.
+        """
+        found = self.entries(game)
+        if not found:
+            return None
+        if not weighted:
+            return found[0].move
+        total = sum(entry.weight for entry in found)
+        if total == 0:
+            return rng.choice(found).move
+        point = rng.randrange(total)
+        for entry in found:
+            point -= entry.weight
+            if point < 0:
+                return entry.move
+
+    def close(self):
+        if self._map:
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
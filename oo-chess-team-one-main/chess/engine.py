@@ -0,0 +1,428 @@
+"""Move search: negamax alpha-beta with iterative deepening.
+
+search() deepens one ply at a time until it reaches max_depth or runs out of
+time_limit seconds, and returns the result of the deepest iteration that
+finished. Moves are tried in the order: the previous iteration's principal
+variation, captures by MVV-LVA (most valuable victim, least valuable
+attacker), killer moves, then quiet moves by history score. Leaves are
+resolved with a quiescence search over captures and promotions.
+
+Results are kept in a transposition table keyed by Game.position_key. With
+workers > 1 the table lives in shared memory and several processes search the
+same root at staggered depths (lazy SMP): each one fills the table with
+results the others pick up, and the deepest finished iteration wins. Run a
+time-to-depth comparison from the command line with:
+
+    python -m chess.engine --depth 6 --workers 1
+    python -m chess.engine --depth 6 --workers 8
+"""
+import argparse
+from collections import namedtuple
+import concurrent.futures
+from multiprocessing import shared_memory
+import struct
+import time
+
+import chess.model as model
+import chess.perft as perft
+from chess.model import EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, KIND_MASK, SQUARES, MOVE_EN_PASSANT, unpack_move
+
+# 'move' and the moves of 'pv' are written like 'e2e4'; 'score' is in centipawns
+# for the side to play, and 'depth' is the deepest iteration that finished.
+SearchResult = namedtuple('SearchResult', 'move score pv nodes depth')
+
+MATE = 100000
+_INFINITY = MATE + 1
+_MAX_PLY = 64
+# Without a limit, search to this depth
+DEFAULT_DEPTH = 4
+# Memory given to the transposition table, in megabytes
+DEFAULT_HASH_MB = 16
+
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900, KING: 0}
+
+
+def _square_bonus(kind, sq):
+    # Small positional bonus for a white piece of the given kind on 'sq'
+    file, rank = sq & 7, sq >> 4
+    centre = 3 - int(max(abs(file - 3.5), abs(rank - 3.5)))  # 0 on the rim, 3 in the centre
+    if kind == PAWN:
+        return rank * 5 + (centre * 5 if 2 <= file <= 5 else 0)
+    if kind in (KNIGHT, BISHOP):
+        return centre * 10 - 10
+    if kind == QUEEN:
+        return centre * 3
+    if kind == KING:
+        # stay tucked away on the back rank while there is material around
+        return 15 if rank == 0 and file in (1, 2, 6) else -5 * rank
+    return 0
+
+
+# Value of each piece code on each 0x88 square, positive for white and negative for black
+_VALUES = [[0] * 128 for _ in range(16)]
+for _kind, _value in PIECE_VALUES.items():
+    for _sq in SQUARES:
+        _VALUES[_kind][_sq] = _value + _square_bonus(_kind, _sq)
+        # black uses the same table mirrored top to bottom
+        _VALUES[_kind | BLACK][_sq] = -(_value + _square_bonus(_kind, _sq ^ 0x70))
+
+
+def evaluate(game):
+    """Static score of the position in centipawns, from the side to play's point of view."""
+    squares = game.board._squares
+    score = 0
+    for sq in SQUARES:
+        code = squares[sq]
+        if code:
+            score += _VALUES[code][sq]
+    return score if game.white_to_play else -score
+
+
+# Bounds of a stored score: exact, at least (failed high) or at most (failed low)
+EXACT, LOWER, UPPER = 1, 2, 3
+
+_HEADER = struct.Struct('<QBB')
+_ENTRY = struct.Struct('<QQ')
+_HEADER_SIZE = 16
+_SCORE_OFFSET = 1 << 27
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results, keyed by 64-bit position keys.
+
+    Entries are 16 bytes: the key XORed with the data, then the data, which
+    packs the best move, score, depth, bound and the search generation that
+    wrote it. Processes sharing the table write entries without locks; an
+    entry torn by two writers no longer XORs back to its key, so it reads as a
+    miss. Entries come in buckets of two: the first keeps the deepest result
+    of the current search, the second always takes the newest one.
+
+    The table lives in a bytearray, or in multiprocessing.shared_memory when
+    'shared' is set; other processes open that with attach(name). A 16 byte
+    header holds the entry count, the current generation and a stop flag.
+    """
+
+    def __init__(self, size_mb=DEFAULT_HASH_MB, shared=False, _shm=None):
+        if _shm is not None:
+            self._shm = _shm
+            self._buf = _shm.buf
+            entries, self.generation, _ = _HEADER.unpack_from(self._buf, 0)
+        else:
+            # round down to a power of two buckets so a mask picks the bucket
+            buckets = max(1, size_mb * 1024 * 1024 // (2 * _ENTRY.size))
+            entries = 2 << (buckets.bit_length() - 1)
+            size = _HEADER_SIZE + entries * _ENTRY.size
+            if shared:
+                self._shm = shared_memory.SharedMemory(create=True, size=size)
+                self._buf = self._shm.buf
+                self._buf[:size] = bytes(size)
+            else:
+                self._shm = None
+                self._buf = bytearray(size)
+            self.generation = 0
+            _HEADER.pack_into(self._buf, 0, entries, 0, 0)
+        self.entries = entries
+        self._mask = entries // 2 - 1
+
+    @classmethod
+    def attach(cls, name):
+        """Open the shared table another process created."""
+        return cls(_shm=shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self._shm.name if self._shm is not None else None
+
+    def close(self):
+        """Let go of a shared table; the process that created it also frees it."""
+        if self._shm is not None:
+            self._buf = None
+            self._shm.close()
+
+    def unlink(self):
+        if self._shm is not None:
+            self._shm.unlink()
+
+    def new_search(self):
+        # Older entries stay usable but give way to the new search's results
+        self.generation = (self.generation + 1) & 0xff
+        _HEADER.pack_into(self._buf, 0, self.entries, self.generation, 0)
+
+    @property
+    def stopped(self):
+        return self._buf[9] != 0
+
+    def stop(self):
+        self._buf[9] = 1
+
+    def probe(self, key):
+        """Return (move, score, depth, bound) stored for 'key', or None."""
+        buf = self._buf
+        offset = _HEADER_SIZE + ((key & self._mask) << 5)
+        for offset in (offset, offset + 16):
+            check, data = _ENTRY.unpack_from(buf, offset)
+            if check ^ data == key and data:
+                return data & 0xffff or None, (data >> 36) - _SCORE_OFFSET, data >> 18 & 0xff, data >> 26 & 3
+        return None
+
+    def store(self, key, move, score, depth, bound):
+        # the packed move fits the low 16 bits; 0 (a1 to a1) stands for no move
+        data = ((move or 0) | depth << 18 | bound << 26
+                | self.generation << 28 | (score + _SCORE_OFFSET) << 36)
+        buf = self._buf
+        offset = _HEADER_SIZE + ((key & self._mask) << 5)
+        check, old = _ENTRY.unpack_from(buf, offset)
+        if old and check ^ old != key and old >> 18 & 0xff > depth and old >> 28 & 0xff == self.generation:
+            # the depth-preferred slot holds a deeper result of this search
+            offset += 16
+        _ENTRY.pack_into(buf, offset, key ^ data, data)
+
+
+def _to_table(score, ply):
+    # Mate scores count plies from the root; the table keeps them relative to the position
+    if score > MATE - _MAX_PLY:
+        return score + ply
+    if score < -MATE + _MAX_PLY:
+        return score - ply
+    return score
+
+
+def _from_table(score, ply):
+    if score > MATE - _MAX_PLY:
+        return score - ply
+    if score < -MATE + _MAX_PLY:
+        return score + ply
+    return score
+
+
+class _Timeout(Exception):
+    pass
+
+
+class _Search:
+    def __init__(self, game, deadline, table):
+        self.game = game
+        self.deadline = deadline
+        self.table = table
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(_MAX_PLY + 1)]
+        self.history = {}
+        # pv[ply] is the best line found from 'ply' on in the current search
+        self.pv = [[] for _ in range(_MAX_PLY + 2)]
+        self.previous_pv = []
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and (time.perf_counter() > self.deadline or self.table.stopped):
+            raise _Timeout()
+
+    def _order(self, moves, ply, table_move=None):
+        squares = self.game.board._squares
+        pv_move = self.previous_pv[ply] if ply < len(self.previous_pv) else None
+        killers = self.killers[ply]
+        history = self.history
+
+        def priority(move):
+            from_sq, to_sq, promotion = unpack_move(move)
+            if move == pv_move or move == table_move:
+                return 1 << 30
+            victim = squares[to_sq] & KIND_MASK
+            attacker = squares[from_sq] & KIND_MASK
+            if victim or promotion or (attacker == PAWN and (to_sq - from_sq) & 15):
+                # MVV-LVA: take the biggest piece with the smallest one first
+                return (1 << 24) + (victim or PAWN) * 16 - attacker + promotion * 64
+            if move in killers:
+                return 1 << 22
+            return history.get(move, 0)
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def _is_capture(self, move):
+        squares = self.game.board._squares
+        from_sq, to_sq, promotion = unpack_move(move)
+        return squares[to_sq] != EMPTY or promotion != EMPTY or move & MOVE_EN_PASSANT != 0
+
+    def negamax(self, depth, alpha, beta, ply):
+        game = self.game
+        self.pv[ply] = []
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply)
+        self._tick()
+
+        key = game.position_key
+        entry = self.table.probe(key)
+        table_move = None
+        if entry is not None:
+            table_move, score, stored_depth, bound = entry
+            if ply > 0 and stored_depth >= depth:
+                score = _from_table(score, ply)
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+
+        white = game.white_to_play
+        moves = game.legal_moves(white)
+        if not moves:
+            # checkmated, or stalemate
+            return -MATE + ply if game.is_check(white) else 0
+        if ply >= _MAX_PLY:
+            return evaluate(game)
+
+        original_alpha = alpha
+        best = -_INFINITY
+        best_move = None
+        for move in self._order(moves, ply, table_move):
+            game._make(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            game._unmake()
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+            if alpha >= beta:
+                if not self._is_capture(move):
+                    killers = self.killers[ply]
+                    if move != killers[0]:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+        if best >= beta:
+            bound = LOWER
+        elif best > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self.table.store(key, best_move, _to_table(best, ply), depth, bound)
+        return best
+
+    def quiescence(self, alpha, beta, ply):
+        game = self.game
+        self._tick()
+        white = game.white_to_play
+        moves = game.legal_moves(white)
+        if not moves:
+            return -MATE + ply if game.is_check(white) else 0
+        stand_pat = evaluate(game)
+        if stand_pat >= beta or ply >= _MAX_PLY:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        captures = [move for move in moves if self._is_capture(move)]
+        for move in self._order(captures, _MAX_PLY):
+            game._make(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            game._unmake()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+
+def _deepen(searcher, max_depth, first_depth=1):
+    # Iterative deepening from 'first_depth'; returns (line, score, depth) of the
+    # deepest iteration that finished, with depth 0 if none did
+    best_line, best_score, completed = [], 0, 0
+    for depth in range(first_depth, max_depth + 1):
+        try:
+            score = searcher.negamax(depth, -_INFINITY, _INFINITY, 0)
+        except _Timeout:
+            break
+        best_line, best_score, completed = searcher.pv[0] or best_line, score, depth
+        searcher.previous_pv = best_line
+        if abs(score) > MATE - _MAX_PLY:
+            # a forced mate was found; searching deeper cannot improve on it
+            break
+    return best_line, best_score, completed
+
+
+def _helper(task):
+    # Worker process entry point: search the root of 'snapshot' into the shared table
+    snapshot, name, max_depth, time_limit, first_depth = task
+    table = TranspositionTable.attach(name)
+    try:
+        searcher = _Search(model.Game.from_snapshot(snapshot), _deadline(time_limit), table)
+        line, score, depth = _deepen(searcher, max_depth, first_depth)
+        return line, score, depth, searcher.nodes
+    finally:
+        table.close()
+
+
+def _deadline(time_limit):
+    return time.perf_counter() + time_limit if time_limit is not None else float('inf')
+
+
+def search(game, max_depth=None, time_limit=None, workers=1, hash_mb=DEFAULT_HASH_MB):
+    """
+    Find a move for the side to play in 'game'. Search deepens until 'max_depth'
+    plies or 'time_limit' seconds, whichever comes first (DEFAULT_DEPTH if neither
+    is given), and stops as soon as the time is up. The game is not changed.
+    With 'workers' > 1, that many processes search together through a shared
+    transposition table of 'hash_mb' megabytes. Returns a SearchResult; its move
+    is None when there are no legal moves.
+    """
+    if max_depth is None:
+        max_depth = _MAX_PLY if time_limit is not None else DEFAULT_DEPTH
+    snapshot = game.snapshot()
+    root = model.Game.from_snapshot(snapshot)
+    root_moves = root.legal_moves()
+    if not root_moves:
+        score = -MATE if root.is_check(root.white_to_play) else 0
+        return SearchResult(None, score, [], 0, 0)
+
+    if workers <= 1:
+        searcher = _Search(root, _deadline(time_limit), TranspositionTable(hash_mb))
+        line, score, depth = _deepen(searcher, max_depth)
+        return _result(line or root_moves[:1], score, searcher.nodes, depth)
+
+    table = TranspositionTable(hash_mb, shared=True)
+    try:
+        table.new_search()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers - 1) as executor:
+            # every other helper starts one ply deeper than this process
+            helpers = [executor.submit(_helper, (snapshot, table.name, max_depth, time_limit, 1 + i % 2))
+                       for i in range(1, workers)]
+            searcher = _Search(root, _deadline(time_limit), table)
+            line, score, depth = _deepen(searcher, max_depth)
+            # the helpers are done once this process is: tell them to stop
+            table.stop()
+            nodes = searcher.nodes
+            for future in helpers:
+                helper_line, helper_score, helper_depth, helper_nodes = future.result()
+                nodes += helper_nodes
+                if helper_depth > depth and helper_line:
+                    line, score, depth = helper_line, helper_score, helper_depth
+    finally:
+        table.close()
+        table.unlink()
+    return _result(line or root_moves[:1], score, nodes, depth)
+
+
+def _result(line, score, nodes, depth):
+    pv = [model.move_text(move) for move in line]
+    return SearchResult(pv[0], score, pv, nodes, depth)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.engine', description=__doc__.splitlines()[0])
+    parser.add_argument('--depth', type=int, default=None, help='plies to search (default: until --time runs out)')
+    parser.add_argument('--time', type=float, default=None, help='seconds to search')
+    parser.add_argument('--workers', type=int, default=1, help='processes searching together')
+    parser.add_argument('--hash', type=int, default=DEFAULT_HASH_MB, help='transposition table size in megabytes')
+    parser.add_argument('--position', default='start', choices=sorted(perft.POSITIONS))
+    args = parser.parse_args(argv)
+
+    game = perft.position(args.position)
+    start = time.perf_counter()
+    result = search(game, args.depth, args.time, args.workers, args.hash)
+    elapsed = time.perf_counter() - start
+    rate = result.nodes / elapsed if elapsed > 0 else float('inf')
+    print(f'{args.position}, {args.workers} worker(s)')
+    print(f'depth: {result.depth}  move: {result.move}  score: {result.score}  pv: {" ".join(result.pv)}')
+    print(f'nodes: {result.nodes}  time: {elapsed:.3f}s  nodes/s: {rate:.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
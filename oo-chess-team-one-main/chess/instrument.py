@@ -0,0 +1,200 @@
+"""Opt-in timing of the Game hot paths.
+
+enable() swaps Game.accept_move, is_check, generate_legal_moves, is_legal_move
+and is_checkmate for wrappers that count calls, time them and count the board
+copies made during each call; disable() puts the plain methods back. While it
+is off nothing is wrapped, so the game runs exactly as fast as without this
+module. Timings are process-wide and include nested calls, e.g. the is_check
+made inside accept_move counts for both.
+
+Latencies go into a histogram of power-of-two buckets: bucket i counts calls
+that took less than 2**i microseconds (the last bucket takes the rest). With
+enable(profile=True) a cProfile profiler runs as well; profile_stats() returns
+what it captured. Game.stats() returns snapshot(). Try it with:
+
+    python -m chess.instrument --games 20 --profile
+"""
+import argparse
+from collections import namedtuple
+import cProfile
+import io
+import pstats
+import random
+import sys
+import time
+
+import chess.bitboard as bitboard
+import chess.model as model
+
+METHODS = ('accept_move', 'is_check', 'generate_legal_moves', 'is_legal_move', 'is_checkmate')
+BUCKETS = 24
+
+# 'histogram' is a tuple of BUCKETS call counts, see the module docstring
+CallStats = namedtuple('CallStats', 'calls seconds copies histogram')
+
+_calls = {}
+_originals = {}
+_copies = 0
+_profiler = None
+# Profilers that have stopped, kept until reset() for profile_stats()
+_profiler_done = []
+
+
+def _record(name):
+    # One counter list per method: calls, seconds, copies, then the histogram
+    counts = _calls.get(name)
+    if counts is None:
+        counts = _calls[name] = [0, 0.0, 0] + [0] * BUCKETS
+    return counts
+
+
+def _timed(name, method):
+    counts = _record(name)
+    clock = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        copies = _copies
+        start = clock()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            counts[0] += 1
+            counts[1] += elapsed
+            counts[2] += _copies - copies
+            counts[3 + min(int(elapsed * 1e6).bit_length(), BUCKETS - 1)] += 1
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def _counted_copy(method):
+    def wrapper(self):
+        global _copies
+        _copies += 1
+        return method(self)
+
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def enabled():
+    return bool(_originals)
+
+
+def enable(profile=False):
+    """Start timing the Game methods in METHODS; with 'profile' also run cProfile."""
+    global _profiler
+    if not _originals:
+        for name in METHODS:
+            method = model.Game.__dict__[name]
+            _originals[model.Game, name] = method
+            setattr(model.Game, name, _timed(name, method))
+        for cls in (model.Board, bitboard.BitboardBoard):
+            method = cls.__dict__['deep_copy']
+            _originals[cls, 'deep_copy'] = method
+            cls.deep_copy = _counted_copy(method)
+    if profile and _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def disable():
+    """Put the plain methods back and stop the profiler. The numbers are kept."""
+    global _profiler
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler_done.append(_profiler)
+        _profiler = None
+
+
+def reset():
+    """Forget all counts, timings and profiles."""
+    global _copies
+    for counts in _calls.values():
+        counts[:] = [0, 0.0, 0] + [0] * BUCKETS
+    _copies = 0
+    _profiler_done.clear()
+
+
+def snapshot():
+    """Return a dict mapping each method that was called to its CallStats."""
+    return {name: CallStats(counts[0], counts[1], counts[2], tuple(counts[3:]))
+            for name, counts in _calls.items() if counts[0]}
+
+
+def profile_stats(stream=None):
+    """Return pstats.Stats of everything profiled so far, or None if nothing was."""
+    profilers = _profiler_done + ([_profiler] if _profiler is not None else [])
+    if not profilers:
+        return None
+    stats = pstats.Stats(profilers[0], stream=stream or sys.stdout)
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    return stats
+
+
+def report(stats=None):
+    """Format a snapshot as a table, one line per method."""
+    stats = snapshot() if stats is None else stats
+    out = io.StringIO()
+    out.write(f'{"method":<22}{"calls":>9}{"total ms":>11}{"mean us":>10}{"copies":>8}  p50/p99 us\n')
+    for name in METHODS:
+        entry = stats.get(name)
+        if entry is None:
+            continue
+        mean = entry.seconds / entry.calls * 1e6
+        out.write(f'{name:<22}{entry.calls:>9}{entry.seconds * 1e3:>11.1f}{mean:>10.1f}{entry.copies:>8}'
+                  f'  <{_percentile(entry, 0.5)}/<{_percentile(entry, 0.99)}\n')
+    return out.getvalue()
+
+
+def _percentile(entry, fraction):
+    # Upper bound in microseconds of the bucket holding the given fraction of calls
+    seen = 0
+    for i, count in enumerate(entry.histogram):
+        seen += count
+        if seen >= fraction * entry.calls:
+            return 1 << i
+    return 1 << (BUCKETS - 1)
+
+
+def _play(games, plies, rng):
+    # Play random legal games through the public methods
+    for _ in range(games):
+        game = model.Game()
+        game.set_up_pieces()
+        for _ in range(plies):
+            moves = game.generate_legal_moves(game.white_to_play)
+            if not moves or game.is_checkmate(game.white_to_play):
+                break
+            from_sq, to_sq = rng.choice(moves)
+            game.accept_move(from_sq + to_sq)
+            game.is_check(game.white_to_play)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.instrument', description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--plies', type=int, default=80)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--profile', action='store_true', help='also print the top cProfile entries')
+    args = parser.parse_args(argv)
+    enable(profile=args.profile)
+    try:
+        _play(args.games, args.plies, random.Random(args.seed))
+    finally:
+        disable()
+    print(report(), end='')
+    if args.profile:
+        profile_stats().sort_stats('cumulative').print_stats(15)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
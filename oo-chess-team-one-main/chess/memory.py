@@ -0,0 +1,53 @@
+"""Memory benchmark: bytes per idle game and per ply of history.
+
+Creates many games set up at the start position and measures the memory they
+allocate with tracemalloc, then plays the same moves in each and measures
+what the move history adds. Run from the command line with:
+
+    python -m chess.memory --games 10000 --plies 40
+"""
+import argparse
+import tracemalloc
+
+import chess.model as model
+
+# A quiet opening that is legal from the start position, repeated as needed
+_MOVES = ['g1f3', 'g8f6', 'f3g1', 'f6g8']
+
+
+def measure(games=10000, plies=40):
+    """Return (bytes per idle game, bytes per ply) over 'games' games of 'plies' moves."""
+    moves = [model.pack_move(model.square(move[:2]), model.square(move[2:])) for move in _MOVES]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        sessions = []
+        for _ in range(games):
+            game = model.Game()
+            game.set_up_pieces()
+            sessions.append(game)
+        idle = tracemalloc.get_traced_memory()[0]
+        for game in sessions:
+            for ply in range(plies):
+                game._make(moves[ply % len(moves)])
+        played = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    per_game = (idle - before) / games
+    per_ply = (played - idle) / (games * plies) if plies else 0.0
+    return per_game, per_ply
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.memory', description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--plies', type=int, default=40)
+    args = parser.parse_args(argv)
+    per_game, per_ply = measure(args.games, args.plies)
+    print(f'games: {args.games}  plies: {args.plies}')
+    print(f'bytes per idle game: {per_game:.0f}  bytes per ply: {per_ply:.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
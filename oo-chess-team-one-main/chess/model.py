@@ -1,35 +1,297 @@
 """Chess Game model."""
+from array import array
+from collections import namedtuple, OrderedDict
 from typing import Optional
 import re
+import struct
+
+from chess.random64 import RANDOM64
+
+# Squares are stored 0x88 style: index = rank * 16 + file, both counted from 0.
+# Any index with a bit of 0x88 set lies off the board, so walking a ray only
+# needs a single mask test instead of separate file and rank bounds checks.
+OFF_BOARD = 0x88
+
+# Pieces are stored on the board as small integer codes: the piece kind in the
+# low three bits, plus BLACK for black pieces. An empty square is 0.
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+BLACK = 8
+KIND_MASK = 7
+
+# The 64 playable squares, a1..h1, a2..h2, ..., a8..h8
+SQUARES = tuple(rank * 16 + file for rank in range(8) for file in range(8))
+
+# The squares packed into each byte of Board.to_bytes
+_SQUARE_PAIRS = tuple(zip(SQUARES[0::2], SQUARES[1::2]))
+
+_SQUARE_NAMES = {sq: 'abcdefgh'[sq & 7] + '12345678'[sq >> 4] for sq in SQUARES}
+_SQUARE_INDEX = {name: sq for sq, name in _SQUARE_NAMES.items()}
+
+A1, B1, C1, D1, E1, F1, G1, H1 = range(0x00, 0x08)
+A8, B8, C8, D8, E8, F8, G8, H8 = range(0x70, 0x78)
+
+
+# Castling rights, as a bitmask kept by Game
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+ALL_CASTLING = 15
+
+# Rights that survive a move touching a square: a move from or onto a corner
+# means that rook has moved or been captured.
+_CASTLING_KEEP = [ALL_CASTLING] * 128
+_CASTLING_KEEP[H1] = ALL_CASTLING & ~WHITE_KINGSIDE
+_CASTLING_KEEP[A1] = ALL_CASTLING & ~WHITE_QUEENSIDE
+_CASTLING_KEEP[H8] = ALL_CASTLING & ~BLACK_KINGSIDE
+_CASTLING_KEEP[A8] = ALL_CASTLING & ~BLACK_QUEENSIDE
+
+# Zobrist keys. The 781 numbers are Polyglot's Random64 table, laid out as in
+# the book format: 64 per piece (black pawn, white pawn, black knight, ... white
+# king), then the four castling rights, the eight en passant files and the side
+# to move. Keys are therefore identical across processes and runs, and a
+# position's key is its key in standard Polyglot books.
+ZOBRIST_RANDOMS = RANDOM64
+
+
+def _zobrist_square_keys(code):
+    # Keys for one piece code, indexed by 0x88 square; all zero for EMPTY and unused codes
+    keys = [0] * 128
+    if PAWN <= code & KIND_MASK <= KING:
+        offset = 64 * (2 * ((code & KIND_MASK) - 1) + (not code & BLACK))
+        for sq in SQUARES:
+            keys[sq] = ZOBRIST_RANDOMS[offset + (sq >> 4) * 8 + (sq & 7)]
+    return keys
+
+
+_ZOBRIST_PIECES = [_zobrist_square_keys(code) for code in range(16)]
+_ZOBRIST_CASTLING = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            _ZOBRIST_CASTLING[_rights] ^= ZOBRIST_RANDOMS[768 + _bit]
+_ZOBRIST_EN_PASSANT = ZOBRIST_RANDOMS[772:780]
+_ZOBRIST_WHITE_TO_PLAY = ZOBRIST_RANDOMS[780]
+
+
+# For two squares on a common rank, file or diagonal, the step that leads from
+# one to the other, indexed by the difference of their 0x88 indices plus 119.
+# The difference between two 0x88 squares pins down their geometry exactly,
+# so a zero entry means the squares share no line.
+_LINE_STEP = [0] * 239
+for _step in (1, -1, 16, -16, 15, -15, 17, -17):
+    for _distance in range(1, 8):
+        _LINE_STEP[_step * _distance + 119] = _step
+
+_ORTHOGONAL = (1, -1, 16, -16)
+_DIAGONAL = (15, -15, 17, -17)
+_KNIGHT_STEPS = (33, 31, 18, 14, -14, -18, -31, -33)
+_KING_STEPS = _ORTHOGONAL + _DIAGONAL
+
+
+def square(location: str) -> int:
+    """Convert a square name such as 'e4' to its board index."""
+    return _SQUARE_INDEX[location]
+
+
+def square_name(sq: int) -> str:
+    """Convert a board index back to its square name."""
+    return _SQUARE_NAMES[sq]
+
+
+# Moves are 16-bit ints:
+#   bits  0-5   square moved from, 0..63 with a1=0 and h8=63
+#   bits  6-11  square moved to
+#   bits 12-15  MOVE_CASTLE, MOVE_EN_PASSANT, or MOVE_PROMOTION plus the kind
+#               promoted to minus KNIGHT; 0 for any other move
+# Lists of them are kept in array('H'), two bytes a move.
+MOVE_CASTLE = 1 << 12
+MOVE_EN_PASSANT = 2 << 12
+MOVE_PROMOTION = 8 << 12
+
+_SQ64 = [0] * 128
+for _index, _sq in enumerate(SQUARES):
+    _SQ64[_sq] = _index
+
+
+def pack_move(from_sq: int, to_sq: int, promotion: int = EMPTY, flags: int = 0) -> int:
+    """
+    Encode a move between two 0x88 squares. 'promotion' is the code or kind of
+    the piece a pawn becomes; 'flags' is MOVE_CASTLE or MOVE_EN_PASSANT.
+    """
+    if promotion:
+        flags = MOVE_PROMOTION | ((promotion & KIND_MASK) - KNIGHT) << 12
+    return _SQ64[from_sq] | _SQ64[to_sq] << 6 | flags
+
+
+def unpack_move(move: int) -> tuple:
+    """Return the 0x88 squares of a move and the kind it promotes to (EMPTY if none)."""
+    return (SQUARES[move & 63], SQUARES[move >> 6 & 63],
+            (move >> 12 & 3) + KNIGHT if move & MOVE_PROMOTION else EMPTY)
+
+
+def move_text(move: int) -> str:
+    """Write a move the way accept_move reads it, e.g. 'e2e4' or 'e7e8q'."""
+    text = _SQUARE_NAMES[SQUARES[move & 63]] + _SQUARE_NAMES[SQUARES[move >> 6 & 63]]
+    if move & MOVE_PROMOTION:
+        text += _PROMOTION_LETTERS[(move >> 12 & 3) + KNIGHT]
+    return text
+
+
+class IllegalMoveError(Exception):
+    """Raised by Game.accept_move for a move that is badly written or breaks the rules."""
+
+
+def piece_from_code(code: int) -> Optional['Piece']:
+    return _MOVERS[code]
 
 
 class Board:
+    __slots__ = ('_squares', 'zobrist', '_kings')
+    # Set on boards that also keep bitboards (see chess.bitboard)
+    bitboards = None
+
     def __init__(self):
-        self._squares = dict()
+        self._squares = bytearray(128)
+        # Zobrist key of the piece placement, updated on every place/clear
+        self.zobrist = 0
+        # square of the white and the black king, or None when there is none
+        self._kings = [None, None]
 
     def get(self, location:str) -> Optional['Piece']:
-        return self._squares.get(location, None)
+        sq = _SQUARE_INDEX.get(location)
+        if sq is None:
+            return None
+        return piece_from_code(self._squares[sq])
 
     def set(self, location:str, piece: 'Piece'):
-        self._squares[location] = piece
+        self.place(square(location), piece.code if piece is not None else EMPTY)
 
     def remove(self, location: str):
-        if location in self._squares:
-            del self._squares[location]
+        self.place(square(location), EMPTY)
+
+    # Integer-square API used by Game. Squares are 0x88 indices and pieces are
+    # integer codes, so no strings or Piece objects are built on these paths.
+
+    def code_at(self, sq: int) -> int:
+        return self._squares[sq]
+
+    def place(self, sq: int, code: int):
+        squares = self._squares
+        old = squares[sq]
+        self.zobrist ^= _ZOBRIST_PIECES[old][sq] ^ _ZOBRIST_PIECES[code][sq]
+        squares[sq] = code
+        if code & KIND_MASK == KING:
+            self._kings[code >> 3] = sq
+        if old & KIND_MASK == KING and self._kings[old >> 3] == sq:
+            # the king was taken off; look for another one only in that rare case
+            self._kings[old >> 3] = next((other for other in SQUARES if squares[other] == old), None)
+
+    def clear(self, sq: int):
+        self.place(sq, EMPTY)
+
+    def king_square(self, is_white: bool) -> Optional[int]:
+        return self._kings[0 if is_white else 1]
+
+    def is_attacked(self, sq: int, by_white: bool) -> bool:
+        """
+        Is the square attacked by a piece of the given colour? Looks outward from
+        the square: knight and king offsets, the two pawn diagonals, and rays that
+        stop at the first piece they meet.
+        """
+        squares = self._squares
+        colour = 0 if by_white else BLACK
+        knight = KNIGHT | colour
+        for step in _KNIGHT_STEPS:
+            other = sq + step
+            if not other & OFF_BOARD and squares[other] == knight:
+                return True
+        king = KING | colour
+        for step in _KING_STEPS:
+            other = sq + step
+            if not other & OFF_BOARD and squares[other] == king:
+                return True
+        # white pawns attack from the rank below, black pawns from the rank above
+        pawn = PAWN | colour
+        for other in ((sq - 15, sq - 17) if by_white else (sq + 15, sq + 17)):
+            if not other & OFF_BOARD and squares[other] == pawn:
+                return True
+        queen = QUEEN | colour
+        for sliders, steps in ((ROOK | colour, _ORTHOGONAL), (BISHOP | colour, _DIAGONAL)):
+            for step in steps:
+                other = sq + step
+                while not other & OFF_BOARD:
+                    code = squares[other]
+                    if code != EMPTY:
+                        if code == sliders or code == queen:
+                            return True
+                        break
+                    other += step
+        return False
+
+    def in_check(self, is_white: bool) -> bool:
+        king = self._kings[0 if is_white else 1]
+        return king is not None and self.is_attacked(king, not is_white)
+
+    def to_bytes(self) -> bytes:
+        """
+        Pack the placement into 32 bytes: one 4-bit piece code per square, a1 first,
+        the even square of each pair in the low nibble.
+        """
+        squares = self._squares
+        return bytes(squares[low] | squares[high] << 4 for low, high in _SQUARE_PAIRS)
+
+    def load_bytes(self, data):
+        """Place the pieces packed by to_bytes onto this (empty) board."""
+        place = self.place
+        for (low, high), byte in zip(_SQUARE_PAIRS, data):
+            for sq, code in ((low, byte & 0xf), (high, byte >> 4)):
+                if code:
+                    if code not in _FEN_LETTERS:
+                        raise ValueError(f"Invalid position record: bad piece code {code}")
+                    place(sq, code)
 
     def deep_copy(self):
         new_board = Board()
-        # Only copy pieces that are not None
-        new_board._squares = {location: piece.copy() if piece is not None else None for location, piece in self._squares.items()}
+        new_board._squares = bytearray(self._squares)
+        new_board.zobrist = self.zobrist
+        new_board._kings = self._kings[:]
         return new_board
-    
+
     def copy(self):
         return self.deep_copy()
 
 class Piece:
-    """Abstract base class for chess pieces."""
-    def __init__(self, is_white: bool) -> None:
-        self._is_white = is_white
+    """
+    Abstract base class for chess pieces. Pieces are immutable flyweights: there
+    is one instance per type and colour, which every call like Pawn(is_white=True)
+    returns.
+    """
+    __slots__ = ('_is_white',)
+    kind = EMPTY
+    # 0x88 steps the piece moves along, and whether it keeps going after one step
+    offsets = ()
+    slides = False
+    illegal_move_message = "Illegal Move: Moving a piece in violation of its movement rules!"
+    _instances = {}
+
+    def __new__(cls, is_white: bool) -> 'Piece':
+        key = (cls, bool(is_white))
+        piece = Piece._instances.get(key)
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, '_is_white', bool(is_white))
+            Piece._instances[key] = piece
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} pieces are immutable")
+
+    def __reduce__(self):
+        # unpickle to the shared instance
+        return type(self), (self._is_white,)
+
+    @property
+    def code(self) -> int:
+        return self.kind if self._is_white else self.kind | BLACK
 
     def __hash__(self):
         return hash((type(self), self._is_white))
@@ -38,52 +300,496 @@ class Piece:
         return hash(self) == hash(other)
 
     def copy(self):
-        # Return a new instance of the same piece
-        return type(self)(self._is_white)
+        # Pieces are shared and immutable, so a copy is the piece itself
+        return self
 
-##first implementation of chess game without use of object oriented class logic
+    def destinations(self, board: Board, sq: int, ep_square: Optional[int] = None):
+        """
+        Yield the squares this piece could move to from 'sq', ignoring whether the
+        move would leave its king in check. Rays are walked outward from 'sq' and
+        stop at the first piece, which is included when it is an enemy.
+        """
+        squares = board._squares
+        own = 0 if self._is_white else BLACK
+        slides = self.slides
+        for step in self.offsets:
+            to = sq + step
+            while not to & OFF_BOARD:
+                target = squares[to]
+                if target != EMPTY:
+                    if target & BLACK != own:
+                        yield to
+                    break
+                yield to
+                if not slides:
+                    break
+                to += step
+
+    def attacks(self, board: Board, sq: int, target: int) -> bool:
+        """Can this piece, standing on 'sq', capture on 'target'?"""
+        diff = target - sq
+        if not self.slides:
+            return diff in self.offsets
+        step = _LINE_STEP[diff + 119]
+        if step not in self.offsets:
+            return False
+        squares = board._squares
+        sq += step
+        while sq != target:
+            if squares[sq] != EMPTY:
+                return False
+            sq += step
+        return True
 
 class Pawn(Piece):
-    #TODO: Implement this class by encapsulating movement rules for this piece here
-    pass
+    __slots__ = ()
+    kind = PAWN
+    illegal_move_message = "Illegal Move: Moving a pawn in violation of pawn-movement rules!"
+
+    @property
+    def offsets(self):
+        # capture steps; pushes go straight ahead
+        return (15, 17) if self._is_white else (-15, -17)
+
+    def destinations(self, board, sq, ep_square=None):
+        squares = board._squares
+        if self._is_white:
+            forward, start_rank, own = 16, 1, 0
+        else:
+            forward, start_rank, own = -16, 6, BLACK
+        to = sq + forward
+        if not to & OFF_BOARD and squares[to] == EMPTY:
+            yield to
+            # two squares forward from the starting rank
+            if sq >> 4 == start_rank and squares[to + forward] == EMPTY:
+                yield to + forward
+        for to in (sq + forward - 1, sq + forward + 1):
+            if not to & OFF_BOARD:
+                target = squares[to]
+                if target != EMPTY:
+                    if target & BLACK != own:
+                        yield to
+                elif to == ep_square and squares[to - forward] == PAWN | (BLACK - own):
+                    yield to
 
 class Rook(Piece):
-    #TODO: Implement this class by encapsulating movement rules for this piece here
-    pass
+    __slots__ = ()
+    kind = ROOK
+    offsets = _ORTHOGONAL
+    slides = True
+    illegal_move_message = "Illegal Move: Moving a Rook to any square not on its row or column!"
 
 class Knight(Piece):
-    #TODO: Implement this class by encapsulating movement rules for this piece here
-    pass
+    __slots__ = ()
+    kind = KNIGHT
+    offsets = _KNIGHT_STEPS
+    illegal_move_message = "Illegal Move: Moving a knight to any square not 3x2 squares aware!"
 
 class Bishop(Piece):
-    #TODO: Implement this class by encapsulating movement rules for this piece here
-    pass
+    __slots__ = ()
+    kind = BISHOP
+    offsets = _DIAGONAL
+    slides = True
+    illegal_move_message = "Illegal Move: Moving a Bishop to any square not on its diagonal!"
 
 class Queen(Piece):
-    #TODO: Implement this class by encapsulating movement rules for this piece here
-    pass
+    __slots__ = ()
+    kind = QUEEN
+    offsets = _ORTHOGONAL + _DIAGONAL
+    slides = True
+    illegal_move_message = "Illegal Move: Moving a queen to any square not on its row, column, or diagonal!"
 
 class King(Piece):
-    #TODO: Implement this class by encapsulating movement rules for this piece here
-    pass
+    # Castling depends on the game's castling rights, so Game handles it
+    __slots__ = ()
+    kind = KING
+    offsets = _KING_STEPS
+    illegal_move_message = "Illegal Move: Moving the king more than one square."
+
+
+_PIECE_TYPES = {PAWN: Pawn, KNIGHT: Knight, BISHOP: Bishop, ROOK: Rook, QUEEN: Queen, KING: King}
+
+# The piece of each code (None for EMPTY), used to look up movement rules for the codes on the board
+_MOVERS = [None] * 16
+for _code in range(16):
+    if PAWN <= _code & KIND_MASK <= KING:
+        _MOVERS[_code] = _PIECE_TYPES[_code & KIND_MASK](is_white=not _code & BLACK)
+
+# Piece a pawn promotes to, by the letter that may follow a move like 'e7e8q'
+_PROMOTIONS = {'q': QUEEN, 'r': ROOK, 'b': BISHOP, 'n': KNIGHT}
+_PROMOTION_LETTERS = {kind: letter for letter, kind in _PROMOTIONS.items()}
+_MOVE_PATTERN = re.compile(r"[a-h][1-8][a-h][1-8]")
+
+
+def _colour(is_white: bool) -> int:
+    return 0 if is_white else BLACK
+
+
+# Piece codes by FEN letter (upper case white, lower case black) and back
+_FEN_PIECES = {letter: kind for kind, letter in zip(range(PAWN, KING + 1), 'PNBRQK')}
+_FEN_PIECES.update({letter.lower(): kind | BLACK for letter, kind in _FEN_PIECES.items()})
+_FEN_LETTERS = {code: letter for letter, code in _FEN_PIECES.items()}
+_FEN_CASTLING = (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Size of Game.to_bytes records: 32 bytes of pieces, then two 16-bit words of state
+POSITION_SIZE = 36
+
+# En passant square of an undo record when there is none: off the board, unlike 0 (a1)
+_NO_EP_SQUARE = 0x7f
+# Largest halfmove clock an undo record has room for (bits 36-63)
+_MAX_HALFMOVE_CLOCK = (1 << 28) - 1
+_POSITION_STATE = struct.Struct('<HH')
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions entries size max_bytes')
+
+# Rough bytes an entry costs besides its move array: the key, the tuple and the dict slot
+_CACHE_ENTRY_OVERHEAD = 160
+
+
+class MoveCache:
+    """
+    Least recently used cache of legal moves, shared by every Game in the process.
+    An entry maps a position key to the array of packed moves for the side to play
+    and whether that side is in check. The key covers the pieces, side to play,
+    castling rights and en passant file, and Board.set and every other change of
+    a piece go through Board.place, which updates it; a changed board is therefore
+    a different key and can never read an old entry. Entries are dropped, least
+    recently used first, once their estimated size passes 'max_bytes'; 0 turns
+    the cache off.
+    """
+
+    def __init__(self, max_bytes=8 << 20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        """Return the (moves, in_check) stored for 'key', or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, key):
+        # Like get, but leaves the counters and the order of use alone
+        return self._entries.get(key)
+
+    def put(self, key, moves, in_check):
+        if self.max_bytes <= 0:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= _CACHE_ENTRY_OVERHEAD + len(old[0]) * 2
+        self._entries[key] = (moves, in_check)
+        self.size += _CACHE_ENTRY_OVERHEAD + len(moves) * 2
+        self._trim()
+
+    def _trim(self):
+        entries = self._entries
+        while self.size > self.max_bytes and entries:
+            moves, _ = entries.popitem(last=False)[1]
+            self.size -= _CACHE_ENTRY_OVERHEAD + len(moves) * 2
+            self.evictions += 1
+
+    def resize(self, max_bytes):
+        # Change the memory cap, dropping entries at once if it shrank
+        self.max_bytes = max_bytes
+        self._trim()
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self._entries), self.size, self.max_bytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# The cache every Game uses
+MOVE_CACHE = MoveCache()
 
 
 class Game:
-    def __init__(self, debug = False):
-        self.board = Board()
+    __slots__ = ('board', 'white_to_play', 'game_over', 'debug', 'move_history', 'position_keys', 'castling',
+                 'ep_square', 'halfmove_clock', 'fullmove_number')
+
+    def __init__(self, debug = False, bitboards = False):
+        if bitboards:
+            # Optional backend: generate moves and detect checks from bitboards
+            from chess.bitboard import BitboardBoard
+            self.board = BitboardBoard()
+        else:
+            self.board = Board()
         self.white_to_play = True
         self.game_over = False
         self.debug = debug
-        self.move_history = []
+        # one packed undo record per move, see _make
+        self.move_history = array('Q')
+        # position_key of the position before each move, for finding repetitions
+        self.position_keys = array('Q')
+        # castling rights still available, as a mask of WHITE_KINGSIDE etc.
+        self.castling = ALL_CASTLING
+        # square a pawn skipped with a double step on the last move, else None
+        self.ep_square = None
+        # plies since the last capture or pawn move, and the number of the current move
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+    def snapshot(self) -> tuple:
+        """
+        Return the position as a small tuple of immutable values that pickles in a
+        few hundred bytes: the board's 0x88 array, side to move, castling rights and
+        en passant square. Move history is not included.
+        """
+        return bytes(self.board._squares), self.white_to_play, self.castling, self.ep_square
+
+    @classmethod
+    def from_snapshot(cls, snapshot: tuple, bitboards = False) -> 'Game':
+        """Create a game at the position returned by snapshot()."""
+        squares, white_to_play, castling, ep_square = snapshot
+        game = cls(bitboards=bitboards)
+        for sq in SQUARES:
+            if squares[sq]:
+                game.board.place(sq, squares[sq])
+        game.white_to_play = white_to_play
+        game.castling = castling
+        game.ep_square = ep_square
+        return game
+
+    @classmethod
+    def from_fen(cls, fen: str, bitboards = False) -> 'Game':
+        """
+        Create a game at the position of a FEN record. The pieces are placed on the
+        board directly, without replaying or validating any moves. The move clocks
+        may be left out and default to 0 and 1.
+        """
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError(f"Invalid FEN: expected 4 or 6 fields in '{fen}'")
+        placement, side, castling, ep_square = fields[:4]
+        rows = placement.split('/')
+        if len(rows) != 8 or side not in ('w', 'b'):
+            raise ValueError(f"Invalid FEN: '{fen}'")
+
+        game = cls(bitboards=bitboards)
+        board = game.board
+        for rank, row in zip(range(7, -1, -1), rows):
+            sq = rank * 16
+            end = sq + 8
+            for char in row:
+                if char in '12345678':
+                    sq += int(char)
+                else:
+                    code = _FEN_PIECES.get(char)
+                    if code is None or sq >= end:
+                        raise ValueError(f"Invalid FEN: bad rank '{row}'")
+                    board.place(sq, code)
+                    sq += 1
+            if sq != end:
+                raise ValueError(f"Invalid FEN: rank '{row}' does not have 8 squares")
+
+        game.white_to_play = side == 'w'
+        rights = 0
+        if castling != '-':
+            for letter, right in _FEN_CASTLING:
+                if letter in castling:
+                    rights |= right
+        game.castling = rights
+        if ep_square != '-':
+            # the square a pawn of the side that just moved skipped: rank 6 or rank 3
+            if ep_square not in _SQUARE_INDEX or ep_square[1] != ('6' if game.white_to_play else '3'):
+                raise ValueError(f"Invalid FEN: bad en passant square '{ep_square}'")
+            game.ep_square = square(ep_square)
+        if len(fields) == 6:
+            halfmove_clock, fullmove_number = int(fields[4]), int(fields[5])
+            if not 0 <= halfmove_clock <= _MAX_HALFMOVE_CLOCK or fullmove_number < 0:
+                raise ValueError(f"Invalid FEN: bad move clocks '{fields[4]} {fields[5]}'")
+            game.halfmove_clock = halfmove_clock
+            game.fullmove_number = fullmove_number
+        return game
+
+    def to_fen(self) -> str:
+        """Return the FEN record of the current position."""
+        squares = self.board._squares
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for sq in range(rank * 16, rank * 16 + 8):
+                code = squares[sq]
+                if code == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += _FEN_LETTERS[code]
+            rows.append(row + str(empty) if empty else row)
+        castling = ''.join(letter for letter, right in _FEN_CASTLING if self.castling & right) or '-'
+        ep_square = square_name(self.ep_square) if self.ep_square is not None else '-'
+        side = 'w' if self.white_to_play else 'b'
+        return f"{'/'.join(rows)} {side} {castling} {ep_square} {self.halfmove_clock} {self.fullmove_number}"
+
+    def to_bytes(self) -> bytes:
+        """
+        Encode the position in POSITION_SIZE (36) bytes: the 32 bytes of
+        Board.to_bytes, then a little-endian 16-bit word holding the side to move
+        (bit 0), castling rights (bits 1-4), en passant file plus one (bits 5-8, 0
+        for none) and the halfmove clock up to 127 (bits 9-15), then the move
+        number as another 16-bit word.
+        """
+        ep = self.ep_square
+        state = (self.white_to_play | self.castling << 1 | (0 if ep is None else (ep & 7) + 1) << 5
+                 | min(self.halfmove_clock, 127) << 9)
+        return self.board.to_bytes() + _POSITION_STATE.pack(state, min(self.fullmove_number, 0xffff))
+
+    @classmethod
+    def from_bytes(cls, data, bitboards = False) -> 'Game':
+        """Create a game at a position encoded by to_bytes."""
+        if len(data) != POSITION_SIZE:
+            raise ValueError(f"Invalid position record: expected {POSITION_SIZE} bytes, got {len(data)}")
+        game = cls(bitboards=bitboards)
+        game.board.load_bytes(data[:32])
+        state, game.fullmove_number = _POSITION_STATE.unpack_from(data, 32)
+        game.white_to_play = bool(state & 1)
+        game.castling = state >> 1 & 0xf
+        ep_file = state >> 5 & 0xf
+        if ep_file > 8:
+            raise ValueError(f"Invalid position record: bad en passant file {ep_file}")
+        if ep_file:
+            # the skipped square is on the 6th rank when white is to capture, else on the 3rd
+            game.ep_square = (0x50 if game.white_to_play else 0x20) + ep_file - 1
+        game.halfmove_clock = state >> 9
+        return game
+
+    @property
+    def position_key(self) -> int:
+        """
+        64-bit Zobrist key of the position: pieces, side to move, castling rights
+        and en passant file. As in Polyglot, the en passant file only counts when
+        a pawn of the side to move stands ready to capture.
+        """
+        key = self.board.zobrist ^ _ZOBRIST_CASTLING[self.castling]
+        if self.white_to_play:
+            key ^= _ZOBRIST_WHITE_TO_PLAY
+        ep = self.ep_square
+        if ep is not None:
+            # pawns that could capture stand beside the pawn that just moved
+            if self.white_to_play:
+                pawn, behind = PAWN, ep - 16
+            else:
+                pawn, behind = PAWN | BLACK, ep + 16
+            squares = self.board._squares
+            if (not (behind - 1) & OFF_BOARD and squares[behind - 1] == pawn) or \
+                    (not (behind + 1) & OFF_BOARD and squares[behind + 1] == pawn):
+                key ^= _ZOBRIST_EN_PASSANT[ep & 7]
+        return key
+
+    # Each entry of move_history is an undo record packed into a single int:
+    #   bits  0-6   square the piece moved from
+    #   bits  7-13  square the piece moved to
+    #   bits 14-17  code of the moved piece
+    #   bits 18-21  code of the captured piece (EMPTY if none)
+    #   bit  22     set if the move was a castle
+    #   bit  23     set if the move was an en passant capture
+    #   bit  24     set if white was to play before the move
+    #   bits 25-28  castling rights before the move
+    #   bits 29-35  en passant square before the move (_NO_EP_SQUARE if none)
+    #   bits 36-    halfmove clock before the move
+    # A castle is a king move of two files; the rook's squares follow from it.
+    # That is enough to take the move back exactly, without copying the board.
+
+    def _make(self, move):
+        """
+        Play a move (a packed int, see pack_move) on the board without validating
+        it, and record how to undo it. A pawn reaching the last rank without a
+        promotion in the move becomes a queen.
+        """
+        key = self.position_key
+        from_sq = SQUARES[move & 63]
+        to_sq = SQUARES[move >> 6 & 63]
+        board = self.board
+        piece = board.code_at(from_sq)
+        captured = board.code_at(to_sq)
+        kind = piece & KIND_MASK
+        castle = en_passant = False
+        promotion = EMPTY
+        if kind == PAWN:
+            if captured == EMPTY and (to_sq - from_sq) & 15:
+                # a diagonal step onto an empty square is an en passant capture:
+                # the captured pawn stands beside the pawn, not on the target square
+                en_passant = True
+                captured_sq = to_sq - 16 if not piece & BLACK else to_sq + 16
+                captured = board.code_at(captured_sq)
+                board.clear(captured_sq)
+            elif to_sq >> 4 in (0, 7):
+                promotion = ((move >> 12 & 3) + KNIGHT if move & MOVE_PROMOTION else QUEEN) | (piece & BLACK)
+        elif kind == KING and abs(to_sq - from_sq) == 2:
+            castle = True
+            rook_from = to_sq | 7 if to_sq > from_sq else to_sq & 0x70
+            board.place((from_sq + to_sq) >> 1, board.code_at(rook_from))
+            board.clear(rook_from)
+        # fill the target before emptying the origin, so the board never loses track of a moving king
+        board.place(to_sq, promotion or piece)
+        board.clear(from_sq)
+        self.position_keys.append(key)
+        rights = self.castling
+        ep = _NO_EP_SQUARE if self.ep_square is None else self.ep_square
+        self.move_history.append(
+            from_sq | to_sq << 7 | piece << 14 | captured << 18 | castle << 22 | en_passant << 23
+            | self.white_to_play << 24 | rights << 25 | ep << 29 | self.halfmove_clock << 36)
+        if rights:
+            rights &= _CASTLING_KEEP[from_sq] & _CASTLING_KEEP[to_sq]
+            if kind == KING:
+                rights &= BLACK_KINGSIDE | BLACK_QUEENSIDE if piece & BLACK == 0 else WHITE_KINGSIDE | WHITE_QUEENSIDE
+            self.castling = rights
+        if kind == PAWN and abs(to_sq - from_sq) == 32:
+            self.ep_square = (from_sq + to_sq) >> 1
+        else:
+            self.ep_square = None
+        if kind == PAWN or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece & BLACK:
+            self.fullmove_number += 1
+        self.white_to_play = not self.white_to_play
 
-    def save_state(self, captured_piece=None):
-        # Create a deep copy of the board, current turn, and any captured piece
-        state = {
-            'board': self.board.deep_copy(),
-            'white_to_play': self.white_to_play,
-            'captured_piece': captured_piece  # Store the captured piece, if any
-        }
-        self.move_history.append(state)
+    def _unmake(self):
+        """Take back the last move played with _make."""
+        record = self.move_history.pop()
+        self.position_keys.pop()
+        board = self.board
+        from_sq = record & 0x7f
+        to_sq = record >> 7 & 0x7f
+        piece = record >> 14 & 0xf
+        captured = record >> 18 & 0xf
+        if record >> 22 & 1:
+            rook_from = to_sq | 7 if to_sq > from_sq else to_sq & 0x70
+            rook_to = (from_sq + to_sq) >> 1
+            board.place(rook_from, board.code_at(rook_to))
+            board.clear(rook_to)
+        board.place(from_sq, piece)
+        if record >> 23 & 1:
+            board.clear(to_sq)
+            board.place(to_sq - 16 if not piece & BLACK else to_sq + 16, captured)
+        else:
+            board.place(to_sq, captured)
+        self.white_to_play = bool(record >> 24 & 1)
+        self.castling = record >> 25 & 0xf
+        ep = record >> 29 & 0x7f
+        self.ep_square = None if ep == _NO_EP_SQUARE else ep
+        self.halfmove_clock = record >> 36
+        if piece & BLACK:
+            self.fullmove_number -= 1
 
     def undo_move(self):
         """
@@ -93,369 +799,154 @@ class Game:
             print("No moves to undo.")
             return
 
-        # Restore the last saved state
-        last_state = self.move_history.pop()
-        self.board = last_state['board']
-        self.white_to_play = last_state['white_to_play']
-        # Restore any additional state information as needed
-        # ...
+        self._unmake()
 
-        # If a piece was captured, restore it to its previous location
-        captured_piece = last_state['captured_piece']
-        if captured_piece:
-            self.board.set(captured_piece['location'], captured_piece['piece'])
+    def parse_move(self, text):
+        """
+        Convert a move written like 'e2e4' or 'e7e8q' into a packed int, with the
+        castle and en passant flags set from the position. The move is not checked.
+        """
+        # check the format of move
+        if not isinstance(text, str) or _MOVE_PATTERN.match(text) is None:
+            raise IllegalMoveError("Incorrect Format: Please enter a move in the format of 'a1a2' and try again.")
+        from_sq = _SQUARE_INDEX[text[:2]]
+        to_sq = _SQUARE_INDEX[text[2:4]]
+        # a pawn reaching the last rank may name the piece it promotes to, e.g. 'e7e8n'
+        promotion = EMPTY
+        if len(text) > 4:
+            letter = text[4].lower()
+            if letter not in _PROMOTIONS:
+                raise IllegalMoveError("Incorrect Format: Promote to 'q', 'r', 'b' or 'n', e.g. 'e7e8q'.")
+            promotion = _PROMOTIONS[letter]
+        kind = self.board.code_at(from_sq) & KIND_MASK
+        flags = 0
+        if kind == KING and abs(to_sq - from_sq) == 2:
+            flags = MOVE_CASTLE
+        elif kind == PAWN:
+            if (to_sq - from_sq) & 15 and self.board.code_at(to_sq) == EMPTY:
+                flags = MOVE_EN_PASSANT
+            if to_sq >> 4 not in (0, 7):
+                promotion = EMPTY
+        return pack_move(from_sq, to_sq, promotion, flags)
 
     def accept_move(self, move):
-        # TODO: Implement updating the board with the give move
-
-        self.save_state()
+        # Validate and play a move written like 'e2e4'; see push
+        self.push(self.parse_move(move))
 
-        # check the format of move
-        pattern = re.compile(r"[a-h][1-8][a-h][1-8]")
-        if bool(pattern.match(move)) == False:
-            raise Exception("Incorrect Format: Please enter a move in the format of 'a1a2' and try again.")
-
-        prevLocation = move[:2]
-        newLocation = move[2:]
-        piece = self.board.get(prevLocation)
-        captured_piece = self.board.get(newLocation)
+    def push(self, move):
+        """
+        Validate and play a packed int move. Raises IllegalMoveError, leaving the
+        game as it was, if the move breaks the rules.
+        """
+        # From here on squares are 0x88 indices and pieces are integer codes
+        prevLocation = SQUARES[move & 63]
+        newLocation = SQUARES[move >> 6 & 63]
+        board = self.board
+        piece = board.code_at(prevLocation)
 
         # check for move a non-existent piece
-        if piece == None:
-            raise Exception("Illegal Move: Moving a non-existent piece!")
+        if piece == EMPTY:
+            raise IllegalMoveError("Illegal Move: Moving a non-existent piece!")
 
-        # check for move my opponent's piece
-        if (piece._is_white != self.white_to_play) and (self.debug == False):
-            raise Exception("Illegal Move: Moving your opponent's piece!")
-
-        # check for move my Bishop to any square not on its diagonal
-        # print(type(piece) == Bishop)
-        if (type(piece) == Bishop):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = abs(ord(newLocation[1:]) - ord(prevLocation[1:]))
-            if (dx != dy):
-                raise Exception("Illegal Move: Moving a Bishop to any square not on its diagonal!")
-
-        # check for move my rook to any square not on its row or column.
-        if (type(piece) == Rook):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = abs(ord(newLocation[1:]) - ord(prevLocation[1:]))
-            if (dx != 0 and dy != 0):
-                raise Exception("Illegal Move: Moving a Rook to any square not on its row or column!")
-
-        # check for move my queen to any square not on its row, column, or diagonal.
-        if (type(piece) == Queen):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = abs(ord(newLocation[1:]) - ord(prevLocation[1:]))
-            if (dx != 0 and dy != 0) and (dx != dy):
-                raise Exception("Illegal Move: Moving a queen to any square not on its row, column, or diagonal!")
-
-        # check for move my knight to any square not 3x2 squares aware.
-        if (type(piece) == Knight):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = abs(ord(newLocation[1:]) - ord(prevLocation[1:]))
-            if (dx + dy != 3 or dx == 0 or dy == 0):
-                raise Exception("Illegal Move: Moving a knight to any square not 3x2 squares aware!")
-
-        # check for move any piece other than a knight over existing pieces.
-        if (type(piece) != Knight):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = abs(ord(newLocation[1:]) - ord(prevLocation[1:]))
-
-            collision_warning = "Illegal Move: Moving any piece other than a knight over existing pieces!"
-            # if moving on same row or column
-            if dx != dy:
-                # check for collision on same row
-                # left to right
-                if (ord(newLocation[:1]) > ord(prevLocation[:1])):
-                    for char in range(ord(prevLocation[:1])+1, ord(newLocation[:1]), 1):
-                        temp = chr(char) + newLocation[1:]
-                        if (self.board.get(temp) != None):
-                            raise Exception(collision_warning)
-
-                # right to left
-                if (ord(newLocation[:1]) < ord(prevLocation[:1])):
-                    for char in range(ord(prevLocation[:1])-1, ord(newLocation[:1]), -1):
-                        temp = chr(char) + newLocation[1:]
-                        if (self.board.get(temp) != None):
-                            raise Exception(collision_warning)
-
-                # check for collision on same column
-                # bottom to top
-                if (ord(newLocation[1:]) > ord(prevLocation[1:])):
-                    for char in range(ord(prevLocation[1:])+1, ord(newLocation[1:]), 1):
-                        temp = newLocation[:1] + chr(char)
-                        if (self.board.get(temp) != None):
-                            raise Exception(collision_warning)
-
-                # top to bottom
-                if (ord(newLocation[1:]) < ord(prevLocation[1:])):
-                    for char in range(ord(prevLocation[1:])-1, ord(newLocation[1:]), -1):
-                        temp = newLocation[:1] + chr(char)
-                        if (self.board.get(temp) != None):
-                            raise Exception(collision_warning)
-
-            # if moving on diagonal
-            if dx == dy:
-                # left-bottom to right-top
-                if (ord(newLocation[:1]) > ord(prevLocation[:1])):
-                    y_coordinate = prevLocation[1:]
-                    for char in range(ord(prevLocation[:1])+1, ord(newLocation[:1]), 1):
-                        y_coordinate = int(y_coordinate)+1
-                        temp = chr(char) + str(y_coordinate)
-                        if (self.board.get(temp) != None):
-                            raise Exception(collision_warning)
-
-                # right-top to left-bottom
-                if (ord(newLocation[:1]) < ord(prevLocation[:1])):
-                    y_coordinate = prevLocation[1:]
-                    for char in range(ord(prevLocation[:1])-1, ord(newLocation[:1]), -1):
-                        y_coordinate = int(y_coordinate)-1
-                        temp = chr(char) + str(y_coordinate)
-                        if (self.board.get(temp) != None):
-                            raise Exception(collision_warning)
-
-        # check for move any piece to a square occupied by another of my pieces.
-        if (self.board.get(newLocation) != None):
-            if (piece._is_white == self.board.get(newLocation)._is_white):
-                raise Exception("Illegal Move: Moving any piece to a square occupied by another of your pieces!")
-
-        # check for move my pawn in violation of pawn-movement rules.
-        if (type(piece) == Pawn):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = (ord(newLocation[1:]) - ord(prevLocation[1:]))
-
-            pawn_illegal_move_warning = "Illegal Move: Moving a pawn in violation of pawn-movement rules!"
-
-            # Move forward
-            if (dx == 0):
-                if (piece._is_white):
-                    if (dy < 0):
-                        raise Exception(pawn_illegal_move_warning)
-                    if(int(prevLocation[1:])==2 and dy>2):
-                        raise Exception(pawn_illegal_move_warning)
-                    if(int(prevLocation[1:])!=2 and dy>1):
-                        raise Exception(pawn_illegal_move_warning)
-                else:
-                    dy = -dy
-                    if (dy < 0):
-                        raise Exception(pawn_illegal_move_warning)
-                    if(int(prevLocation[1:])==7 and dy>2):
-                        raise Exception(pawn_illegal_move_warning)
-                    if(int(prevLocation[1:])!=7 and dy>1):
-                        raise Exception(pawn_illegal_move_warning)
-                if(self.board.get(newLocation) != None):
-                    raise Exception(pawn_illegal_move_warning)
-
-            # move too far
-            if (dx > 1 or (dx == 1 and abs(dy) > 1)):
-                raise Exception(pawn_illegal_move_warning)
-
-            # move in the same row
-            if (dx == 1 and dy == 0):
-                raise Exception(pawn_illegal_move_warning)
-
-            # capture enemy
-            if (dx == abs(dy)):
-                if (piece._is_white):
-                    if (dy < 0):
-                        raise Exception(pawn_illegal_move_warning)
-                else:
-                    dy = -dy
-                    if (dy < 0):
-                        raise Exception(pawn_illegal_move_warning)
-                if (self.board.get(newLocation) == None):
-                    raise Exception(pawn_illegal_move_warning)
+        is_white = not piece & BLACK
 
-        # check for move my king in violation of king-movement rules.
-        if (type(piece) == King):
-            dx = abs(ord(newLocation[:1]) - ord(prevLocation[:1]))
-            dy = abs(ord(newLocation[1:]) - ord(prevLocation[1:]))
+        # check for move my opponent's piece
+        if (is_white != self.white_to_play) and (self.debug == False):
+            raise IllegalMoveError("Illegal Move: Moving your opponent's piece!")
 
+        mover = _MOVERS[piece]
+        if piece & KIND_MASK == KING and abs(newLocation - prevLocation) == 2:
             # move my king two squares towards my rook and see the rook also moved to complete a castle.
-            if (dx == 2 and dy == 0):
-                # castling for white king
-                if piece._is_white and (prevLocation == "d1"):
-                    # white king castling to right
-                    if (newLocation == "f1") and (type(self.board.get("h1")) == Rook) and (self.board.get("e1") == None) and (self.board.get("f1") == None) and (self.board.get("g1") == None):
-                        # move king to f1
-                        self.board.set(prevLocation, None)
-                        self.board.set(newLocation, King(is_white=True))
-                        # move rook to e1
-                        self.board.set("h1", None)
-                        self.board.set("e1", Rook(is_white=True))
-                        # check if the move causes a check
-                        if self.is_check(piece._is_white):
-                            # Undo the move
-                            self.board.set(prevLocation, piece)
-                            self.board.set(newLocation, captured_piece)
-                            self.board.set("h1", Rook(is_white=True))
-                            self.board.set("e1", None)
-                            # Since the move causes the king to be in check, it's not a valid move
-                            raise Exception("Illegal Move: This move would leave your king in check.")
-                    # white king castling to left
-                    elif (newLocation == "b1") and (type(self.board.get("a1")) == Rook) and self.board.get("b1") == None and self.board.get("c1") == None:
-                        # move king to b1
-                        self.board.set(prevLocation, None)
-                        self.board.set(newLocation, King(is_white=True))
-                        # move rook to c1
-                        self.board.set("a1", None)
-                        self.board.set("c1", Rook(is_white=True))
-                        # check if the move causes a check
-                        if self.is_check(piece._is_white):
-                            # Undo the move
-                            self.board.set(prevLocation, piece)
-                            self.board.set(newLocation, captured_piece)
-                            self.board.set("a1", Rook(is_white=True))
-                            self.board.set("c1", None)
-                            # Since the move causes the king to be in check, it's not a valid move
-                            raise Exception("Illegal Move: This move would leave your king in check.")
-
-                # castling for black king
-                elif not piece._is_white and prevLocation == "d8":
-                    # black king castling to right
-                    if (newLocation == "f8") and (type(self.board.get("h8")) == Rook) and (self.board.get("e8") == None) and (self.board.get("f8") == None) and (self.board.get("g8") == None):
-                        # move king to f8
-                        self.board.set(prevLocation, None)
-                        self.board.set(newLocation, King(is_white=False))
-                        # move rook to e8
-                        self.board.set("h8", None)
-                        self.board.set("e8", Rook(is_white=False))
-                        # check if the move causes a check
-                        if self.is_check(piece._is_white):
-                            # Undo the move
-                            self.board.set(prevLocation, piece)
-                            self.board.set(newLocation, captured_piece)
-                            self.board.set("h8", Rook(is_white=False))
-                            self.board.set("e8", None)
-                            # Since the move causes the king to be in check, it's not a valid move
-                            raise Exception("Illegal Move: This move would leave your king in check.")
-                    # black king castling to left
-                    elif (newLocation == "b8") and (type(self.board.get("a8")) == Rook) and self.board.get("b8") == None and self.board.get("c8") == None:
-                        # move king to b8
-                        self.board.set(prevLocation, None)
-                        self.board.set(newLocation, King(is_white=False))
-                        # move rook to c8
-                        self.board.set("a8", None)
-                        self.board.set("c8", Rook(is_white=False))
-                        # check if the move causes a check
-                        if self.is_check(piece._is_white):
-                            # Undo the move
-                            self.board.set(prevLocation, piece)
-                            self.board.set(newLocation, captured_piece)
-                            self.board.set("a8", Rook(is_white=False))
-                            self.board.set("c8", None)
-                            # Since the move causes the king to be in check, it's not a valid move
-                            raise Exception("Illegal Move: This move would leave your king in check.")
-
-                # not satisfy the castling rules but seems like attempting to castle
-                else:
-                    raise Exception("Illegal Move: Moving the king more than one square or performing castling incorrectly.")
-
-            # normal king movement
-            elif (dx > 1 or dy > 1):
-                raise Exception("Illegal Move: Moving the king more than one square.")
-
-        #TODO check for make any other moves prohibited by movement rules
+            if self._castling_rook(piece, prevLocation, newLocation) is None:
+                raise IllegalMoveError("Illegal Move: Moving the king more than one square or performing castling incorrectly.")
+        elif newLocation not in mover.destinations(board, prevLocation, self.ep_square):
+            raise IllegalMoveError(self._illegal_move_reason(mover, prevLocation, newLocation))
 
-        self.board.set(newLocation, piece)
-        self.board.set(prevLocation, None)
+        self._make(move)
 
         # Check if the move causes a check
-        if self.is_check(piece._is_white):
+        if self.is_check(is_white):
             # Undo the move
-            self.board.set(prevLocation, piece)
-            self.board.set(newLocation, captured_piece)
-            # self.undo_move(piece, prevLocation, newLocation, captured_piece)
+            self._unmake()
 
             # Since the move causes the king to be in check, it's not a valid move
-            raise Exception("Illegal Move: This move would leave your king in check.")
+            raise IllegalMoveError("Illegal Move: This move would leave your king in check.")
 
-        self.white_to_play = not self.white_to_play
+    def pop(self):
+        # Take back the last move; unlike undo_move, raise IndexError if there is none
+        if not self.move_history:
+            raise IndexError('pop from an empty move history')
+        self._unmake()
+
+    def _illegal_move_reason(self, mover, from_sq, to_sq):
+        # Explain why 'to_sq' is not among the destinations of the piece on 'from_sq'
+        target = self.board.code_at(to_sq)
+        if target != EMPTY and target & BLACK == mover.code & BLACK:
+            return "Illegal Move: Moving any piece to a square occupied by another of your pieces!"
+        if mover.slides and _LINE_STEP[to_sq - from_sq + 119] in mover.offsets:
+            return "Illegal Move: Moving any piece other than a knight over existing pieces!"
+        return mover.illegal_move_message
+
+    def _castling_rook(self, king, from_sq, to_sq):
+        """
+        Return the square of the rook the king on 'from_sq' castles with by moving to
+        'to_sq', or None if it may not castle there. The king starts on the d- or
+        e-file of its back rank and moves two squares towards a corner rook, which
+        jumps to the square the king crosses. All squares between king and rook must
+        be empty, and the king may not be in check or cross an attacked square.
+        """
+        is_white = not king & BLACK
+        back_rank = 0 if is_white else 0x70
+        if from_sq & 0x70 != back_rank or from_sq & 7 not in (3, 4) or abs(to_sq - from_sq) != 2:
+            return None
+        if to_sq > from_sq:
+            step, rook_sq = 1, back_rank | 7
+            right = WHITE_KINGSIDE if is_white else BLACK_KINGSIDE
+        else:
+            step, rook_sq = -1, back_rank
+            right = WHITE_QUEENSIDE if is_white else BLACK_QUEENSIDE
+        squares = self.board._squares
+        if not self.castling & right or squares[rook_sq] != ROOK | _colour(is_white):
+            return None
+        for sq in range(from_sq + step, rook_sq, step):
+            if squares[sq] != EMPTY:
+                return None
+        if self.is_attacked(from_sq, not is_white) or self.is_attacked(from_sq + step, not is_white):
+            return None
+        return rook_sq
+
+    def is_attacked(self, sq, by_white):
+        """Is the 0x88 square 'sq' attacked by a piece of the given colour?"""
+        return self.board.is_attacked(sq, by_white)
 
     def is_check(self, is_white):
-        # Check if the current player's king is in check.
-        
-        # Find the king's position
-        king_position = None
-        for location, piece in self.board._squares.items():
-            if isinstance(piece, King) and piece._is_white == is_white:
-                king_position = location
-                break
-
-        # If the king's position isn't found, return False (should not happen in a valid game)
-        if king_position is None:
-            return False
-
-        # Check all squares to see if any piece of the opposite color can attack the king
-        for location, piece in self.board._squares.items():
-            if piece and piece._is_white != is_white:
-                if self.can_piece_attack(piece, location, king_position):
-                    return True
-        return False
+        # Check if the player's king is in check. The board tracks where the
+        # kings stand and looks outward from the king for attackers.
+        return self.board.in_check(is_white)
 
     def can_piece_attack(self, piece, start, end):
-        
         #Determine if a piece can attack the square at 'end' from its current 'start' position.
-        #This method checks if a move is theoretically possible for the given piece type.
-        
-        start_col, start_row = start[0], int(start[1])
-        end_col, end_row = end[0], int(end[1])
-        dx = abs(ord(end_col) - ord(start_col))
-        dy = abs(end_row - start_row)
-
-        if isinstance(piece, Bishop):
-            if dx == dy:
-                return self.is_path_clear(start, end, dx, dy)
-            return False
-
-        if isinstance(piece, Rook):
-            if dx == 0 or dy == 0:
-                return self.is_path_clear(start, end, dx, dy)
-            return False
-
-        if isinstance(piece, Queen):
-            if dx == dy or dx == 0 or dy == 0:
-                return self.is_path_clear(start, end, dx, dy)
-            return False
+        #'piece' is a Piece, 'start' and 'end' are square names like 'e2'.
+        return self._can_piece_attack(piece.code, square(start), square(end))
 
-        if isinstance(piece, Knight):
-            return (dx == 2 and dy == 1) or (dx == 1 and dy == 2)
+    def _can_piece_attack(self, piece, start, end):
+        # Same as can_piece_attack for an integer piece code and 0x88 squares
+        return _MOVERS[piece].attacks(self.board, start, end)
 
-        if isinstance(piece, Pawn):
-            dy = end_row - start_row if piece._is_white else start_row - end_row
-            if dx == 1 and dy == 1:  # Diagonal capture
-                target_piece = self.board.get(end)
-                if target_piece and target_piece._is_white != piece._is_white:
-                    return True  # There is an opponent's piece to capture
-            return False  # No capture possible
-
-        if isinstance(piece, King):
-            return dx <= 1 and dy <= 1  # King can move one square in any direction
-
-        return False
-
-    def is_path_clear(self, start, end, dx, dy):
+    def is_path_clear(self, start, end, dx=None, dy=None):
         """
         Check if the path is clear for the piece to move from start to end. This does not include the end square.
+        'dx' and 'dy' are accepted for compatibility; the direction follows from the squares.
         """
-        if dx == 0:  # Moving vertically
-            step = 1 if start[1] < end[1] else -1
-            for y in range(int(start[1]) + step, int(end[1]), step):
-                if self.board.get(f'{start[0]}{y}') is not None:
-                    return False
-        elif dy == 0:  # Moving horizontally
-            step = 1 if start[0] < end[0] else -1
-            for x in range(ord(start[0]) + step, ord(end[0]), step):
-                if self.board.get(f'{chr(x)}{start[1]}') is not None:
-                    return False
-        else:  # Moving diagonally
-            step_x = 1 if start[0] < end[0] else -1
-            step_y = 1 if start[1] < end[1] else -1
-            for x, y in zip(range(ord(start[0]) + step_x, ord(end[0]), step_x),
-                            range(int(start[1]) + step_y, int(end[1]), step_y)):
-                if self.board.get(f'{chr(x)}{y}') is not None:
-                    return False
+        from_sq, to_sq = square(start), square(end)
+        step = _LINE_STEP[to_sq - from_sq + 119]
+        if not step:
+            # not on a rank, file or diagonal: no squares in between
+            return True
+        squares = self.board._squares
+        for sq in range(from_sq + step, to_sq, step):
+            if squares[sq] != EMPTY:
+                return False
         return True
 
     def set_up_pieces(self):
@@ -502,156 +993,311 @@ class Game:
 
 
     def can_attack(self, piece, from_pos, to_pos):
-        #Determine if a piece can attack the square at 'to_pos' from its current 'from_pos' position.
-        #This method checks if a move is theoretically possible for the given piece type.
-        
-        start_col, start_row = from_pos[0], int(from_pos[1])
-        end_col, end_row = to_pos[0], int(to_pos[1])
-        dx = abs(ord(end_col) - ord(start_col))
-        dy = abs(end_row - start_row)
-
-        # Check if the target position is occupied by a piece of the same color
-        target_piece = self.board.get(to_pos)
-        if target_piece and target_piece._is_white == piece._is_white:
-            return False  # Can't capture your own piece
-
-        if isinstance(piece, Bishop):
-            if dx == dy:
-                return self.is_path_clear(from_pos, to_pos, dx, dy)
-
-        elif isinstance(piece, Rook):
-            if dx == 0 or dy == 0:
-                return self.is_path_clear(from_pos, to_pos, dx, dy)
-
-        elif isinstance(piece, Queen):
-            if dx == dy or dx == 0 or dy == 0:
-                return self.is_path_clear(from_pos, to_pos, dx, dy)
-
-        elif isinstance(piece, Knight):
-            return (dx == 2 and dy == 1) or (dx == 1 and dy == 2)
-
-        elif isinstance(piece, Pawn):
-            # Include pawn's forward movement for non-capturing moves
-            dy = end_row - start_row if piece._is_white else start_row - end_row
-            if dx == 0 and (dy == 1 or (dy == 2 and ((start_row == 2 and piece._is_white) or (start_row == 7 and not piece._is_white)))):
-                return self.board.get(to_pos) is None  # Forward move is only possible if the target square is empty
-            elif dx == 1 and dy == 1:  # Diagonal capture
-                return target_piece is not None and target_piece._is_white != piece._is_white  # Must be an opponent's piece to capture
-
-        elif isinstance(piece, King):
-            # Normal king movement
-            if dx <= 1 and dy <= 1:
-                return True
-            # Castling
-            elif dy == 0 and dx == 2:
-                return False
-            else:
-                return False
-        # other conditions to consider?
-
-    def generate_legal_moves(self, is_white):
-        legal_moves = []
-
-        for pos, piece in self.board._squares.items():
-            if piece is not None and piece._is_white == is_white:
-                for target_pos in self.board._squares:
-                    if self.is_legal_move(piece, pos, target_pos):
-                        legal_moves.append((pos, target_pos))
-
-        return legal_moves
-
-    def is_legal_move(self, piece, from_pos, to_pos):
-        # If the destination is the same as the starting point, it's not a move
-        if from_pos == to_pos:
-            return False
-
-        # Check for valid movement patterns for the given piece
-        if not self.can_piece_attack(piece, from_pos, to_pos):
-            return False
+        #Determine if a piece can move to the square at 'to_pos' from its current 'from_pos' position.
+        #'piece' is a Piece, 'from_pos' and 'to_pos' are square names like 'e2'.
+        return self._can_attack(piece.code, square(from_pos), square(to_pos))
+
+    def _can_attack(self, piece, from_pos, to_pos):
+        # Same as can_attack for an integer piece code and 0x88 squares
+        return to_pos in _MOVERS[piece].destinations(self.board, from_pos, self.ep_square)
+
+    def _pseudo_legal_moves(self, is_white):
+        # Yield the packed move of every move of the given colour, ignoring checks
+        squares = self.board._squares
+        colour = _colour(is_white)
+        last_rank = 7 if is_white else 0
+        ep_square = self.ep_square
+        for from_sq in SQUARES:
+            piece = squares[from_sq]
+            if piece == EMPTY or piece & BLACK != colour:
+                continue
+            is_pawn = piece & KIND_MASK == PAWN
+            for to_sq in _MOVERS[piece].destinations(self.board, from_sq, ep_square):
+                if is_pawn and to_sq >> 4 == last_rank:
+                    for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        yield pack_move(from_sq, to_sq, kind)
+                elif is_pawn and to_sq == ep_square and (to_sq - from_sq) & 15:
+                    yield pack_move(from_sq, to_sq, EMPTY, MOVE_EN_PASSANT)
+                else:
+                    yield pack_move(from_sq, to_sq)
+        king_sq = self.board.king_square(is_white)
+        if king_sq is not None:
+            yield from self._castling_moves(is_white, king_sq)
+
+    def _castling_moves(self, is_white, king_sq):
+        # Yield the castles the king on 'king_sq' may play. The rook lands between
+        # the king's two squares, so nothing new can reach the king's target square
+        # through them and a plain attack test on that square is enough.
+        if not self.castling:
+            return
+        king = KING | _colour(is_white)
+        for to_sq in (king_sq + 2, king_sq - 2):
+            if self._castling_rook(king, king_sq, to_sq) is not None and not self.is_attacked(to_sq, not is_white):
+                yield pack_move(king_sq, to_sq, EMPTY, MOVE_CASTLE)
 
-        # Calculate dx and dy based on the current and target positions
-        dx = ord(to_pos[0]) - ord(from_pos[0])  # Difference in files (columns)
-        dy = int(to_pos[1]) - int(from_pos[1])  # Difference in ranks (rows)
+    def _checks_and_pins(self, king_sq, colour):
+        """
+        Look outward from the king of the given colour once. Return the squares of the
+        enemy pieces giving check, the squares a non-king move must land on to answer
+        a single check (None when not in check), and a dict mapping each pinned piece's
+        square to the step from the king towards the piece pinning it.
+        """
+        squares = self.board._squares
+        enemy = colour ^ BLACK
+        queen = QUEEN | enemy
+        checkers = []
+        evasions = None
+        pins = {}
+        for sliders, steps in ((ROOK | enemy, _ORTHOGONAL), (BISHOP | enemy, _DIAGONAL)):
+            for step in steps:
+                sq = king_sq + step
+                pinned = None
+                while not sq & OFF_BOARD:
+                    code = squares[sq]
+                    if code != EMPTY:
+                        if code & BLACK == colour:
+                            if pinned is not None:
+                                break
+                            pinned = sq
+                        else:
+                            if code == sliders or code == queen:
+                                if pinned is None:
+                                    checkers.append(sq)
+                                    # block anywhere on the ray or capture the checker
+                                    evasions = set(range(king_sq + step, sq + step, step))
+                                else:
+                                    pins[pinned] = step
+                            break
+                    sq += step
+        knight = KNIGHT | enemy
+        pawn = PAWN | enemy
+        pawn_steps = (15, 17) if colour == 0 else (-15, -17)
+        for steps, attacker in ((_KNIGHT_STEPS, knight), (pawn_steps, pawn)):
+            for step in steps:
+                sq = king_sq + step
+                if not sq & OFF_BOARD and squares[sq] == attacker:
+                    checkers.append(sq)
+                    evasions = {sq}
+        return checkers, evasions, pins
+
+    def legal_moves(self, is_white=None):
+        """
+        Return an array('H') of the packed moves (see pack_move) legal for the given
+        colour, the side to play by default. The array is new and the caller's own.
+        """
+        return self._legal_moves(self.white_to_play if is_white is None else is_white)
 
-        # Check if the path is clear for pieces that require it (rooks, bishops, queens)
-        if not isinstance(piece, Knight) and not self.is_path_clear(from_pos, to_pos, dx, dy):
-            return False
+    def _legal_moves(self, is_white):
+        # Return an array('H') of the packed moves legal for the given colour
+        moves = array('H')
+        for batch in self._legal_move_batches(is_white):
+            moves.extend(batch)
+        return moves
 
+    def _iter_legal_moves(self, is_white):
+        # Yield the packed moves legal for the given colour, stopping whenever the caller does
+        for batch in self._legal_move_batches(is_white):
+            yield from batch
 
-        # Check for castling legality
-        if isinstance(piece, King) and abs(ord(to_pos[0]) - ord(from_pos[0])) == 2:
-            return self.can_castle(piece.is_white, from_pos, to_pos)
+    def _legal_move_batches(self, is_white):
+        """
+        Yield the legal moves of the given colour piece by piece, as sequences of
+        packed moves, so a caller can stop after the first piece that can move.
+        Pins, checkers and the squares that answer a check are worked out once,
+        so moves are emitted already legal. Only en passant captures, which take
+        a pawn off a square other than their target, are still tried on the board.
+        The game must not change while the generator is running.
+        """
+        board = self.board
+        king_sq = board.king_square(is_white)
+        if board.bitboards is not None:
+            yield board.legal_moves(is_white, self.ep_square)
+            if king_sq is not None and not board.in_check(is_white):
+                yield self._castling_moves(is_white, king_sq)
+            return
+        if king_sq is None:
+            # without a king to protect every move is legal
+            yield self._pseudo_legal_moves(is_white)
+            return
 
-        # Make the move on a temporary copy of the board to see if it would put the king in check
-        temp_game = Game()
-        temp_game.board = self.board.copy()
-        try:
-            temp_game.accept_move(from_pos + to_pos)
-            if temp_game.is_check(piece.is_white):
-                return False
-        except Exception as e:
-            # If accept_move throws an exception, the move is illegal
-            return False
+        squares = board._squares
+        colour = _colour(is_white)
+        king = KING | colour
+        checkers, evasions, pins = self._checks_and_pins(king_sq, colour)
+
+        # The king may go to any square that is not attacked. Lift it off the board
+        # while testing, so rays through its current square are not blocked by it,
+        # and put it back before the moves are handed out.
+        squares[king_sq] = EMPTY
+        moves = [pack_move(king_sq, to_sq) for to_sq in _MOVERS[king].destinations(board, king_sq)
+                 if not board.is_attacked(to_sq, not is_white)]
+        squares[king_sq] = king
+        yield moves
+        if len(checkers) > 1:
+            # double check: only the king can move
+            return
+        if not checkers:
+            yield self._castling_moves(is_white, king_sq)
+
+        last_rank = 7 if is_white else 0
+        ep_square = self.ep_square
+        for from_sq in SQUARES:
+            piece = squares[from_sq]
+            if piece == EMPTY or piece & BLACK != colour or piece == king:
+                continue
+            pin = pins.get(from_sq)
+            is_pawn = piece & KIND_MASK == PAWN
+            moves = []
+            for to_sq in _MOVERS[piece].destinations(board, from_sq, ep_square):
+                if is_pawn and to_sq == ep_square and (to_sq - from_sq) & 15:
+                    # en passant empties two squares at once; try it on the board
+                    move = pack_move(from_sq, to_sq, EMPTY, MOVE_EN_PASSANT)
+                    if self._is_legal_trial(is_white, move):
+                        moves.append(move)
+                    continue
+                if evasions is not None and to_sq not in evasions:
+                    continue
+                if pin is not None and _LINE_STEP[to_sq - king_sq + 119] != pin:
+                    continue
+                if is_pawn and to_sq >> 4 == last_rank:
+                    for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        moves.append(pack_move(from_sq, to_sq, kind))
+                else:
+                    moves.append(pack_move(from_sq, to_sq))
+            if moves:
+                yield moves
+
+    def _is_legal_trial(self, is_white, move):
+        # Make the move on the board to see if it would put the king in check, then take it back
+        self._make(move)
+        in_check = self.is_check(is_white)
+        self._unmake()
+        return not in_check
+
+    def _cached_legal_moves(self, is_white):
+        """
+        Return the legal moves of the given colour and whether it is in check,
+        through MOVE_CACHE when that colour is the side to play. The array is
+        shared with the cache and must not be changed.
+        """
+        if is_white != self.white_to_play:
+            return self._legal_moves(is_white), self.is_check(is_white)
+        key = self.position_key
+        entry = MOVE_CACHE.get(key)
+        if entry is None:
+            entry = self._legal_moves(is_white), self.is_check(is_white)
+            MOVE_CACHE.put(key, *entry)
+        return entry
 
-        # If all checks pass, the move is legal
-        return True
+    def generate_legal_moves(self, is_white):
+        # Moves are (from, to) square names; a promotion adds the piece letter to 'to', e.g. ('e7', 'e8q')
+        return [(text[:2], text[2:]) for text in map(move_text, self._cached_legal_moves(is_white)[0])]
 
-    def can_castle(self, is_white, from_pos, to_pos):
-        # Check if the king has moved, which would make castling illegal
-        if self.has_king_moved(is_white):
-            return False
+    def iter_legal_moves(self, is_white=None):
+        """
+        Yield the legal moves of the given colour (the side to play by default) in
+        the form generate_legal_moves uses, working out each piece's moves only when
+        the caller gets to it. Do not play moves on the game while iterating.
+        """
+        if is_white is None:
+            is_white = self.white_to_play
+        for move in self._iter_legal_moves(is_white):
+            text = move_text(move)
+            yield text[:2], text[2:]
+
+    def has_legal_move(self, is_white=None):
+        # True as soon as one legal move is found for the given colour (the side to play by default)
+        if is_white is None:
+            is_white = self.white_to_play
+        if is_white == self.white_to_play:
+            # a partial scan is not worth storing, so only use an entry already there
+            entry = MOVE_CACHE.peek(self.position_key)
+            if entry is not None:
+                return bool(entry[0])
+        return next(self._iter_legal_moves(is_white), None) is not None
+
+    def repetitions(self):
+        """
+        How many times the current position has stood on the board, counting now.
+        Only positions since the last capture or pawn move can repeat, and only
+        those with the same side to play, so at most 50 keys are compared.
+        """
+        key = self.position_key
+        keys = self.position_keys
+        count = 1
+        for i in range(len(keys) - 2, len(keys) - 1 - min(self.halfmove_clock, len(keys)), -2):
+            if keys[i] == key:
+                count += 1
+        return count
+
+    def is_fifty_moves(self):
+        # Fifty moves by each side without a capture or a pawn move
+        return self.halfmove_clock >= 100
+
+    def is_threefold_repetition(self):
+        return self.repetitions() >= 3
+
+    def status(self):
+        """
+        Return 'checkmate', 'stalemate', 'fifty-move' (fifty moves by each side
+        without a capture or pawn move), 'repetition' (the position has stood on
+        the board three times) or 'ongoing' for the side to play. Stops at the
+        first legal move found, so an ongoing game costs a few move trials.
+        """
+        if not self.has_legal_move():
+            return 'checkmate' if self.is_check(self.white_to_play) else 'stalemate'
+        if self.is_fifty_moves():
+            return 'fifty-move'
+        if self.is_threefold_repetition():
+            return 'repetition'
+        return 'ongoing'
+
+    @staticmethod
+    def stats():
+        # Call counts, timings and board copies of the hot paths, see chess.instrument.
+        # Empty unless chess.instrument.enable() was called.
+        from chess import instrument
+        return instrument.snapshot()
+
+    def best_move(self, time_limit=None, workers=1, max_depth=None):
+        # Search for the side to play's best move, written like 'e2e4', or None if it has no move.
+        # With several workers the search runs in that many processes sharing one transposition table.
+        from chess import engine
+        return engine.search(self, max_depth, time_limit, workers).move
 
-        # Determine the direction of the castling move
-        direction = 1 if to_pos[0] > from_pos[0] else -1
+    def is_legal_move(self, piece, from_pos, to_pos):
+        # 'piece' is a Piece, 'from_pos' and 'to_pos' are square names like 'e2'
+        return self._is_legal_move(piece.code, square(from_pos), square(to_pos))
 
-        # Check if the path between the king and the rook is clear
-        if not self.is_path_clear_for_castling(is_white, from_pos, direction):
+    def _is_legal_move(self, piece, from_pos, to_pos):
+        # 'piece' is an integer piece code, 'from_pos' and 'to_pos' are 0x88 squares.
+        # If the destination is the same as the starting point, it's not a move
+        if from_pos == to_pos:
             return False
-
-        # Check if the king is currently in check
-        if self.is_check(is_white):
+        # The piece has to be standing on the starting square
+        if self.board.code_at(from_pos) != piece:
             return False
 
-        # Check if any of the squares the king would move through are under attack
-        if self.is_king_passing_through_attack(is_white, from_pos, direction):
+        # Check for valid movement patterns for the given piece
+        if piece & KIND_MASK == KING and abs(to_pos - from_pos) == 2:
+            if self._castling_rook(piece, from_pos, to_pos) is None:
+                return False
+        elif not self._can_attack(piece, from_pos, to_pos):
             return False
 
-        # If all checks pass, castling is legal
-        return True
-
+        # If all checks pass, the move is legal
+        return self._is_legal_trial(not piece & BLACK, pack_move(from_pos, to_pos))
 
     def make_move(self, move):
+        # Perform the move and change the player turn; a promotion letter may follow the target square
         from_pos, to_pos = move
-        piece = self.board.get(from_pos)
-
-        # Perform the move
-        self.board.set(to_pos, piece)
-        self.board.set(from_pos, None)
-
-        # Change the player turn
-        self.white_to_play = not self.white_to_play
+        self._make(self.parse_move(from_pos + to_pos))
 
     def is_checkmate(self, is_white):
         # If the player is not currently in check, it's not a checkmate
         if not self.is_check(is_white):
             return False
 
-        # Generate all legal moves for the player
-        legal_moves = self.generate_legal_moves(is_white)
-
-        # If there are no legal moves, and the player is in check, it's checkmate
-        if not legal_moves:
-            return True
-
-        # Try each move to see if it gets the king out of check
-        for move in legal_moves:
-            # Make the move on a copy of the board
-            board_copy = self.board.copy()
-            board_copy.make_move(move)
-
-            # If after making the move, the player is not in check, it's not a checkmate
-            if not board_copy.is_check(is_white):
-                return False
-
-        # If no moves get the king out of check, it's checkmate
-        return True
\ No newline at end of file
+        # A move is only legal if it leaves the king out of check, so any legal
+        # move escapes the check; stop looking at the first one.
+        return not self.has_legal_move(is_white)
@@ -0,0 +1,105 @@
+"""Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+Comparing the counts with published values checks move generation, and timing
+them measures its speed. Run from the command line with:
+
+    python -m chess.perft --depth 4
+    python -m chess.perft --position kiwipete --depth 3 --divide
+"""
+import argparse
+import time
+
+import chess.model as model
+
+# Standard test positions with their known node counts by depth
+POSITIONS = {
+    'start': (None, {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    'endgame': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    'promotions': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                   {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    'talkchess': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                  {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    'middlegame': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                   {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+}
+
+def position(name, bitboards=False):
+    """Return a new Game set up at one of the POSITIONS."""
+    fen = POSITIONS[name][0]
+    if fen is None:
+        game = model.Game(bitboards=bitboards)
+        game.set_up_pieces()
+        return game
+    return model.Game.from_fen(fen, bitboards)
+
+
+def perft(game, depth):
+    """Count the positions reached after exactly 'depth' legal moves."""
+    if depth == 0:
+        return 1
+    moves = game.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game._make(move)
+        nodes += perft(game, depth - 1)
+        game._unmake()
+    return nodes
+
+
+def divide(game, depth):
+    """Return (move, nodes) for every root move, with moves written like 'e2e4'."""
+    results = []
+    for move in game.legal_moves():
+        game._make(move)
+        results.append((model.move_text(move), perft(game, depth - 1)))
+        game._unmake()
+    return results
+
+
+def run(name, depth, show_divide=False, bitboards=False, out=print):
+    """Run perft on a named position, print the results and return whether the count was as expected."""
+    game = position(name, bitboards)
+    start = time.perf_counter()
+    if show_divide:
+        results = divide(game, depth)
+        nodes = sum(count for _, count in results)
+    else:
+        nodes = perft(game, depth)
+    elapsed = time.perf_counter() - start
+
+    out(f'{name}, depth {depth}')
+    if show_divide:
+        for move, count in sorted(results):
+            out(f'  {move}: {count}')
+    rate = nodes / elapsed if elapsed > 0 else float('inf')
+    out(f'nodes: {nodes}  time: {elapsed:.3f}s  nodes/s: {rate:.0f}')
+
+    expected = POSITIONS[name][1].get(depth)
+    if expected is not None and expected != nodes:
+        out(f'MISMATCH: expected {expected} nodes')
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.perft', description=__doc__.splitlines()[0])
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--position', default='start', choices=sorted(POSITIONS) + ['all'])
+    parser.add_argument('--divide', action='store_true', help='show the node count below each root move')
+    parser.add_argument('--bitboards', action='store_true', help='use the bitboard backend')
+    args = parser.parse_args(argv)
+
+    names = sorted(POSITIONS) if args.position == 'all' else [args.position]
+    ok = True
+    for name in names:
+        ok = run(name, args.depth, args.divide, args.bitboards) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
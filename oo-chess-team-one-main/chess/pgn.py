@@ -0,0 +1,204 @@
+"""Streaming PGN reader.
+
+read_games() yields the games of a PGN file or stream one at a time, holding
+no more than the game being read. Headers are parsed as each game is read;
+its moves are only tokenised and replayed through Game.accept_move when the
+caller iterates PgnGame.moves(). SAN moves such as 'Nbd7' or 'exd6' are
+translated into the coordinate form accept_move reads, such as 'b8d7'. Time
+the two stages on a file from the command line with:
+
+    python -m chess.pgn games.pgn
+    python -m chess.pgn games.pgn --replay
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import chess.model as model
+from chess.model import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, KIND_MASK
+
+_HEADER = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+
+# Movetext tokens; only the last group, a SAN move, is kept
+_TOKENS = re.compile(r'''
+    \{[^}]*\}?              # comment
+  | ;[^\n]*                 # comment to the end of the line
+  | \$\d+                   # numeric annotation glyph
+  | ([()])                  # start or end of a variation
+  | (?:1-0|0-1|1/2-1/2|\*)  # result
+  | \d+\.+                  # move number
+  | ([^\s{}();$.]+)         # move
+''', re.VERBOSE)
+
+_SAN = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQnbrq]))?')
+_SAN_PIECES = {'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+_CASTLES = {'O-O': 2, '0-0': 2, 'O-O-O': -2, '0-0-0': -2}
+
+
+def san_to_move(game, san):
+    """
+    Translate the SAN move 'san' for the side to play in 'game' into the form
+    accept_move reads, e.g. 'Nbd7' into 'b8d7' or 'e8=Q' into 'e7e8q'. Raises
+    ValueError if no legal move or more than one matches.
+    """
+    text = san.rstrip('+#!?')
+    white = game.white_to_play
+    board = game.board
+    candidates = game.legal_moves(white)
+    if text in _CASTLES:
+        king_sq = board.king_square(white)
+        target = None if king_sq is None else king_sq + _CASTLES[text]
+        found = [move for move in candidates
+                 if move >> 12 == model.MOVE_CASTLE >> 12 and model.unpack_move(move)[1] == target]
+    else:
+        match = _SAN.fullmatch(text)
+        if match is None:
+            raise ValueError(f"Unreadable SAN move '{san}'")
+        piece, file, rank, target, promotion = match.groups()
+        kind = _SAN_PIECES[piece] if piece else PAWN
+        target = model.square(target)
+        promotion = model._PROMOTIONS[promotion.lower()] if promotion else model.EMPTY
+        found = []
+        for move in candidates:
+            from_sq, to_sq, promoted = model.unpack_move(move)
+            if to_sq != target or board.code_at(from_sq) & KIND_MASK != kind:
+                continue
+            if file is not None and from_sq & 7 != ord(file) - ord('a'):
+                continue
+            if rank is not None and from_sq >> 4 != int(rank) - 1:
+                continue
+            if promoted != promotion:
+                continue
+            found.append(move)
+    if not found:
+        raise ValueError(f"Illegal SAN move '{san}'")
+    if len(found) > 1:
+        raise ValueError(f"Ambiguous SAN move '{san}'")
+    return model.move_text(found[0])
+
+
+class PgnGame:
+    """One game of a PGN file: its headers, and its moves on demand."""
+
+    def __init__(self, headers, movetext):
+        self.headers = headers
+        self.movetext = movetext
+
+    @property
+    def result(self):
+        return self.headers.get('Result', '*')
+
+    def start(self):
+        """Return a Game at the starting position, which a FEN header may change."""
+        fen = self.headers.get('FEN')
+        if fen is not None:
+            return model.Game.from_fen(fen)
+        game = model.Game()
+        game.set_up_pieces()
+        return game
+
+    def san_moves(self):
+        """Yield the SAN moves of the main line, skipping comments and variations."""
+        depth = 0
+        for match in _TOKENS.finditer(self.movetext):
+            bracket, move = match.groups()
+            if bracket is not None:
+                depth += 1 if bracket == '(' else -1
+            elif move is not None and depth == 0:
+                yield move
+
+    def moves(self, game=None):
+        """
+        Replay the main line through accept_move on 'game' (by default a new game
+        from start()) and yield each move in accept_move form, e.g. 'e2e4'.
+        """
+        if game is None:
+            game = self.start()
+        for san in self.san_moves():
+            move = san_to_move(game, san)
+            game.accept_move(move)
+            yield move
+
+    def replay(self):
+        """Replay the whole main line and return the Game at its final position."""
+        game = self.start()
+        for _ in self.moves(game):
+            pass
+        return game
+
+
+def read_games(source):
+    """Yield a PgnGame for every game in 'source', a file path or a text stream."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding='utf-8', errors='replace') as stream:
+            yield from _read(stream)
+    else:
+        yield from _read(source)
+
+
+def _read(stream):
+    headers = {}
+    movetext = []
+    # open '{' comments, which may run over several lines and hold anything
+    comments = 0
+    for line in stream:
+        if comments == 0 and line.startswith('['):
+            if movetext:
+                # a header after movetext starts the next game
+                yield PgnGame(headers, ''.join(movetext))
+                headers = {}
+                movetext = []
+            match = _HEADER.match(line)
+            if match is not None:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+            continue
+        if line.startswith('%') or not line.strip():
+            continue
+        movetext.append(line)
+        comments = max(0, comments + line.count('{') - line.count('}'))
+    if headers or movetext:
+        yield PgnGame(headers, ''.join(movetext))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.pgn', description=__doc__.splitlines()[0])
+    parser.add_argument('file', help="PGN file to read, or '-' for standard input")
+    parser.add_argument('--replay', action='store_true', help='also replay every game through accept_move')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many games')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.file == '-' else args.file
+    games = plies = failed = 0
+    parse_time = replay_time = 0.0
+    reader = read_games(source)
+    while args.limit is None or games < args.limit:
+        # time reading a game separately from replaying it
+        start = time.perf_counter()
+        pgn_game = next(reader, None)
+        parse_time += time.perf_counter() - start
+        if pgn_game is None:
+            break
+        games += 1
+        if args.replay:
+            start = time.perf_counter()
+            try:
+                for _ in pgn_game.moves():
+                    plies += 1
+            except Exception as e:
+                failed += 1
+                print(f'game {games}: {e}', file=sys.stderr)
+            replay_time += time.perf_counter() - start
+
+    def rate(count, seconds):
+        return count / seconds if seconds > 0 else float('inf')
+
+    print(f'games: {games}  parse: {parse_time:.3f}s  games/s: {rate(games, parse_time):.0f}')
+    if args.replay:
+        print(f'plies: {plies}  failed: {failed}  replay: {replay_time:.3f}s  games/s: {rate(games, replay_time):.0f}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,249 @@
+"""Asyncio server hosting many games over a line-based TCP protocol.
+
+Each request is one line of words and gets one reply line, 'OK ...' or
+'ERR <reason>':
+
+    NEW [fen]               start a game; replies 'OK <id>'
+    MOVE <id> <move>        play a move such as e2e4 or e7e8q
+    UNDO <id>               take back the last move
+    RESIGN <id>             the side to play resigns
+    SHOW <id>               replies 'OK <status> <fen>'
+    WATCH <id>              subscribe to the game's updates
+    UNWATCH <id>            stop them
+    CLOSE <id>              drop the game
+    QUIT                    close the connection
+
+Subscribers are sent 'UPDATE <id> <status> <fen>' after every change, and
+once when they subscribe. The status is one of ongoing, check, checkmate,
+stalemate, fifty-move, repetition, white-resigned and black-resigned; all but
+the first two end the game (the draws by rule are applied, not claimed).
+
+A game is kept as a Game, whose board is a 128 byte array and whose undo log
+holds one int per move, so the memory of a session stays small and does not
+grow with copies of the board. Games are dropped on CLOSE, once they have been
+over for FINISHED_TIMEOUT seconds, or after IDLE_TIMEOUT seconds without a
+request; their subscribers are sent 'CLOSED <id>'.
+Start a server with:
+
+    python -m chess.server --port 8765
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+import chess.model as model
+
+# Subscribers whose unsent output grows past this many bytes are dropped, so a
+# slow reader cannot make the server buffer without bound
+MAX_PENDING_OUTPUT = 1 << 20
+
+# Seconds a game is kept without requests, and after it has ended
+IDLE_TIMEOUT = 3600
+FINISHED_TIMEOUT = 300
+
+
+class Session:
+    """One hosted game and the connections watching it."""
+    __slots__ = ('game', 'watchers', 'resigned', 'status', 'last_used')
+
+    def __init__(self, game):
+        self.game = game
+        self.watchers = set()
+        # 'white' or 'black' once that side has resigned
+        self.resigned = None
+        # time.monotonic() of the last request about this game
+        self.last_used = time.monotonic()
+        self.update_status()
+
+    def update_status(self):
+        # Worked out once per change rather than on every request
+        if self.resigned is not None:
+            self.status = f'{self.resigned}-resigned'
+            return
+        game = self.game
+        status = game.status()
+        if status == 'ongoing' and game.is_check(game.white_to_play):
+            status = 'check'
+        self.status = status
+
+    @property
+    def over(self):
+        return self.status not in ('ongoing', 'check')
+
+
+class ChessServer:
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, finished_timeout=FINISHED_TIMEOUT):
+        self.sessions = {}
+        self.idle_timeout = idle_timeout
+        self.finished_timeout = finished_timeout
+        self._ids = itertools.count(1)
+        self._expiry = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """
+        Start listening and return the asyncio.Server; port 0 picks a free port.
+        Expired games are dropped in the background while the server is open.
+        """
+        server = await asyncio.start_server(self._serve, host, port)
+        if self._expiry is None:
+            self._expiry = asyncio.get_running_loop().create_task(self._expire_loop(server))
+        return server
+
+    async def _expire_loop(self, server):
+        interval = max(1, min(self.idle_timeout, self.finished_timeout) / 4)
+        try:
+            while server.is_serving():
+                await asyncio.sleep(interval)
+                self.expire()
+        finally:
+            self._expiry = None
+
+    def expire(self, now=None):
+        """Drop the games idle or finished for longer than their timeout; return their ids."""
+        now = time.monotonic() if now is None else now
+        expired = [game_id for game_id, session in self.sessions.items()
+                   if now - session.last_used > (self.finished_timeout if session.over else self.idle_timeout)]
+        for game_id in expired:
+            self.close(game_id)
+        return expired
+
+    def close(self, game_id):
+        # Drop a game and tell its subscribers
+        session = self.sessions.pop(game_id)
+        notice = f'CLOSED {game_id}\n'.encode()
+        for writer in list(session.watchers):
+            self._send(writer, notice)
+        session.watchers.clear()
+
+    async def _serve(self, reader, writer):
+        watching = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode('utf-8', 'replace').split()
+                if not words:
+                    continue
+                if words[0].upper() == 'QUIT':
+                    writer.write(b'OK bye\n')
+                    break
+                try:
+                    reply = self.handle(words, writer, watching)
+                except Exception as e:
+                    reply = f'ERR {e}'
+                writer.write(reply.encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in watching:
+                session = self.sessions.get(game_id)
+                if session is not None:
+                    session.watchers.discard(writer)
+            writer.close()
+
+    def handle(self, words, writer=None, watching=None):
+        """Carry out one request and return the reply line, without its newline."""
+        try:
+            return self._handle(words, writer, watching)
+        except (model.IllegalMoveError, ValueError) as e:
+            return f'ERR {e}'
+
+    def _handle(self, words, writer, watching):
+        command = words[0].upper()
+        if command == 'NEW':
+            if len(words) > 1:
+                game = model.Game.from_fen(' '.join(words[1:]))
+            else:
+                game = model.Game()
+                game.set_up_pieces()
+            game_id = str(next(self._ids))
+            self.sessions[game_id] = Session(game)
+            return f'OK {game_id}'
+
+        if len(words) < 2:
+            return f'ERR {command} needs a game id'
+        session = self.sessions.get(words[1])
+        if session is None:
+            return f'ERR No game {words[1]}'
+        game_id = words[1]
+        session.last_used = time.monotonic()
+
+        if command == 'CLOSE':
+            self.close(game_id)
+            return f'OK {game_id}'
+        if command == 'SHOW':
+            return f'OK {session.status} {session.game.to_fen()}'
+        if command == 'WATCH':
+            if writer is None:
+                return 'ERR WATCH needs a connection'
+            session.watchers.add(writer)
+            watching.add(game_id)
+            self._send(writer, self._update(game_id, session))
+            return f'OK {game_id}'
+        if command == 'UNWATCH':
+            session.watchers.discard(writer)
+            watching.discard(game_id)
+            return f'OK {game_id}'
+        if command == 'MOVE':
+            if len(words) < 3:
+                return 'ERR MOVE needs a move'
+            if session.over:
+                return f'ERR Game is over: {session.status}'
+            session.game.accept_move(words[2].lower())
+        elif command == 'UNDO':
+            if session.resigned is not None:
+                return 'ERR Game is over: a resignation cannot be taken back'
+            if not session.game.move_history:
+                return 'ERR No moves to undo.'
+            session.game.undo_move()
+        elif command == 'RESIGN':
+            if session.over:
+                return f'ERR Game is over: {session.status}'
+            session.resigned = 'white' if session.game.white_to_play else 'black'
+        else:
+            return f'ERR Unknown command {command}'
+        session.update_status()
+        self._broadcast(game_id, session)
+        return f'OK {session.status}'
+
+    def _update(self, game_id, session):
+        return f'UPDATE {game_id} {session.status} {session.game.to_fen()}\n'.encode()
+
+    def _broadcast(self, game_id, session):
+        if session.watchers:
+            update = self._update(game_id, session)
+            for writer in list(session.watchers):
+                self._send(writer, update)
+
+    def _send(self, writer, data):
+        if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_PENDING_OUTPUT:
+            for session in self.sessions.values():
+                session.watchers.discard(writer)
+            writer.close()
+            return
+        writer.write(data)
+
+
+async def serve(host, port):
+    server = await ChessServer().start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.server', description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
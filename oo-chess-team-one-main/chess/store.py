@@ -0,0 +1,119 @@
+"""Append-only on-disk store of positions.
+
+A store file is an 8 byte magic followed by fixed-size Game.to_bytes records,
+so record n starts at a known offset. Readers map the file with mmap and get
+at any record by index without reading the others or building objects for
+them; many processes reading the same store share its pages through the
+operating system's page cache.
+"""
+import mmap
+import os
+
+import chess.model as model
+from chess.model import POSITION_SIZE
+
+MAGIC = b'CHESSPOS'
+
+
+class PositionStore:
+    """
+    Positions stored in the file at 'path', which is created if missing. Open it
+    with readonly=True to map an existing store without write access.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._file = open(path, 'rb' if readonly else 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0 and not readonly:
+            self._file.write(MAGIC)
+            self._file.flush()
+            size = len(MAGIC)
+        self._file.seek(0)
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"'{path}' is not a position store")
+        # An interrupted write can leave part of a record at the end. Readers skip
+        # it; a writer cuts it off so the next record starts where it should.
+        whole = len(MAGIC) + (size - len(MAGIC)) // POSITION_SIZE * POSITION_SIZE
+        if whole != size and not readonly:
+            self._file.truncate(whole)
+        self._size = whole
+        self._map = None
+        self._mapped = 0
+
+    def __len__(self):
+        return (self._size - len(MAGIC)) // POSITION_SIZE
+
+    def append(self, game):
+        """Add the game's current position at the end; return its index."""
+        self._write(game.to_bytes())
+        return len(self) - 1
+
+    def extend(self, games):
+        for game in games:
+            self._write(game.to_bytes())
+
+    def append_bytes(self, record):
+        """Add a record already encoded by Game.to_bytes; return its index."""
+        if len(record) != POSITION_SIZE:
+            raise ValueError(f"Invalid position record: expected {POSITION_SIZE} bytes, got {len(record)}")
+        self._write(record)
+        return len(self) - 1
+
+    def _write(self, record):
+        if self.readonly:
+            raise ValueError('position store was opened read-only')
+        self._file.write(record)
+        self._size += POSITION_SIZE
+
+    def flush(self):
+        if not self.readonly:
+            self._file.flush()
+
+    def record(self, index):
+        """
+        Return record 'index' as a read-only memoryview into the mapped file, with
+        no copy made. Release the view before closing the store.
+        """
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('position index out of range')
+        if index >= self._mapped:
+            self._remap()
+        start = len(MAGIC) + index * POSITION_SIZE
+        return memoryview(self._map)[start:start + POSITION_SIZE]
+
+    def _remap(self):
+        # The file has grown past the mapped part: map it again. An older map still
+        # exported through record() views is left for the garbage collector.
+        self.flush()
+        self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        self._mapped = len(self)
+
+    def __getitem__(self, index):
+        with self.record(index) as record:
+            return model.Game.from_bytes(record)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # record() views are still alive; the map closes once they are gone
+                pass
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
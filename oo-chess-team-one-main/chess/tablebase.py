@@ -0,0 +1,411 @@
+"""Endgame tablebases built by retrograde analysis.
+
+A tablebase covers every position of one material signature such as 'KQK'
+(white king and queen against the black king) or 'KPK'; white's pieces come
+first, and black's start at the second K. generate() visits each position
+once with the model's move generator and links it to the positions its
+moves lead to. Mates are then propagated backwards: a position is won in
+n+1 plies if some move reaches a position lost in n, and lost in n+1 if
+every move reaches a won position, the longest win being n. Positions that
+are never reached that way are draws. Moves that capture or promote leave
+the signature; their values come from the smaller tablebases, which are
+generated (or loaded) first.
+
+Each position is one byte of the table: 0 for a draw, otherwise the number
+of plies to mate plus one. An odd distance means the side to move mates, an
+even one that it gets mated. Castling and en passant are not considered.
+Build tables from the command line with:
+
+    python -m chess.tablebase KQK KRK KPK --dir tables
+"""
+import argparse
+from collections import namedtuple
+import os
+import time
+
+import chess.model as model
+from chess.model import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, KIND_MASK, unpack_move
+
+# 'wdl' is 1 when the side to move wins, -1 when it loses and 0 for a draw;
+# 'dtm' is the number of plies to mate with best play, None for a draw.
+Probe = namedtuple('Probe', 'wdl dtm')
+
+MAGIC = b'CHESSTB1'
+_INVALID = 255
+_LETTERS = {'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+
+
+def _to88(sq):
+    return (sq >> 3) * 16 + (sq & 7)
+
+
+def _to64(sq):
+    return (sq >> 4) * 8 + (sq & 7)
+
+
+# Board symmetries, as permutations of the squares 0..63 (a1=0, h8=63). The
+# first king is brought into a canonical region by one of them: the a1-d1-d4
+# triangle without pawns, the a-d files with pawns, which must keep their ranks.
+def _mirror(f):
+    return tuple(f(sq & 7, sq >> 3) for sq in range(64))
+
+
+_SYMMETRIES = (
+    _mirror(lambda f, r: r * 8 + f),
+    _mirror(lambda f, r: r * 8 + 7 - f),
+    _mirror(lambda f, r: (7 - r) * 8 + f),
+    _mirror(lambda f, r: (7 - r) * 8 + 7 - f),
+    _mirror(lambda f, r: f * 8 + r),
+    _mirror(lambda f, r: f * 8 + 7 - r),
+    _mirror(lambda f, r: (7 - f) * 8 + r),
+    _mirror(lambda f, r: (7 - f) * 8 + 7 - r),
+)
+_TRIANGLE = tuple(sq for sq in range(64) if (sq & 7) <= 3 and (sq >> 3) <= (sq & 7))
+_HALF = tuple(sq for sq in range(64) if (sq & 7) <= 3)
+
+
+def _canonical_maps(region, symmetries):
+    # For each square of the first king, the symmetry taking it into 'region'
+    maps = []
+    for sq in range(64):
+        maps.append(next(symmetry for symmetry in symmetries if symmetry[sq] in region))
+    return maps
+
+
+_PAWNLESS = (_TRIANGLE, _canonical_maps(_TRIANGLE, _SYMMETRIES))
+_WITH_PAWNS = (_HALF, _canonical_maps(_HALF, _SYMMETRIES[:2]))
+
+
+def parse_signature(signature):
+    """Return the piece codes of a signature like 'KQK': white's pieces, then black's."""
+    text = signature.upper()
+    second = text.find('K', 1)
+    if not text.startswith('K') or second < 0 or text.count('K') != 2 or \
+            any(letter not in _LETTERS for letter in text):
+        raise ValueError(f"Invalid material signature '{signature}'")
+    return [_LETTERS[letter] for letter in text[:second]] + [_LETTERS[letter] | BLACK for letter in text[second:]]
+
+
+def signature_of(game):
+    """Return the material signature of the game's position, e.g. 'KQK'."""
+    squares = game.board._squares
+    return _signature_sorted([squares[sq] for sq in model.SQUARES if squares[sq]])
+
+
+def _signature(codes):
+    return ''.join('PNBRQK'[(code & KIND_MASK) - 1] for code in codes)
+
+
+class Tablebase:
+    """The distance to mate of every position of one material signature."""
+
+    def __init__(self, signature, table=None):
+        self.signature = signature
+        self.codes = parse_signature(signature)
+        pawns = any(code & KIND_MASK == PAWN for code in self.codes)
+        self._region, self._maps = _WITH_PAWNS if pawns else _PAWNLESS
+        self._region_index = {sq: i for i, sq in enumerate(self._region)}
+        self.size = len(self._region) * 64 ** (len(self.codes) - 1) * 2
+        self.table = table if table is not None else bytearray(self.size)
+
+    # Positions are numbered (((k * 64 + s1) * 64 + s2) ...) * 2 + side, where k
+    # is the first king's place in the canonical region, s1, s2, ... are the
+    # squares of the other pieces in signature order and side is 1 with white to play.
+
+    def index(self, pieces, white_to_play):
+        """
+        Index of the position with the given (code, square) pieces, squares 0..63,
+        after bringing it into canonical form. The pieces must match the signature.
+        """
+        by_code = {}
+        for code, sq in pieces:
+            by_code.setdefault(code, []).append(sq)
+        for squares in by_code.values():
+            squares.sort()
+        taken = {}
+        ordered = []
+        for code in self.codes:
+            i = taken.get(code, 0)
+            ordered.append(by_code[code][i])
+            taken[code] = i + 1
+        return self._ordered_index(ordered, white_to_play)
+
+    def _ordered_index(self, squares, white_to_play):
+        # index() for squares already given in signature order
+        symmetry = self._maps[squares[0]]
+        index = self._region_index[symmetry[squares[0]]]
+        for sq in squares[1:]:
+            index = index * 64 + symmetry[sq]
+        return index * 2 + bool(white_to_play)
+
+    def _decode(self, index):
+        # The squares of the pieces, in signature order, and the side to move
+        index, side = divmod(index, 2)
+        squares = []
+        for _ in range(len(self.codes) - 1):
+            index, sq = divmod(index, 64)
+            squares.append(sq)
+        squares.append(self._region[index])
+        squares.reverse()
+        return squares, bool(side)
+
+    def probe(self, game):
+        """
+        Return the Probe for the game's position, or None when the position is not
+        covered: other material, castling rights, or not a reachable position.
+        """
+        if game.castling:
+            return None
+        squares = game.board._squares
+        pieces = [(squares[sq], _to64(sq)) for sq in model.SQUARES if squares[sq]]
+        if sorted(code for code, _ in pieces) != sorted(self.codes):
+            return None
+        return _probe_value(self.table[self.index(pieces, game.white_to_play)])
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(MAGIC + self.signature.encode().ljust(8) + bytes(self.table))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:8] != MAGIC:
+            raise ValueError(f"'{path}' is not a tablebase")
+        tablebase = cls(data[8:16].decode().strip(), data[16:])
+        if len(tablebase.table) != tablebase.size:
+            raise ValueError(f"'{path}' is truncated")
+        return tablebase
+
+
+def _probe_value(value):
+    if value == _INVALID:
+        return None
+    if value == 0:
+        return Probe(0, None)
+    dtm = value - 1
+    return Probe(1 if dtm & 1 else -1, dtm)
+
+
+def _smaller_signatures(codes):
+    # Signatures reached by a capture or a promotion
+    found = set()
+    for i, code in enumerate(codes):
+        if code & KIND_MASK != KING:
+            found.add(_signature_sorted(codes[:i] + codes[i + 1:]))
+        if code & KIND_MASK == PAWN:
+            for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                found.add(_signature_sorted(codes[:i] + [kind | (code & BLACK)] + codes[i + 1:]))
+    return found
+
+
+def _signature_sorted(codes):
+    order = (KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN)
+    white = sorted((code for code in codes if not code & BLACK), key=order.index)
+    black = sorted((code & KIND_MASK for code in codes if code & BLACK), key=order.index)
+    return _signature(white + black)
+
+
+def _load_needed(signature, tables, directory):
+    # Make sure 'tables' holds every tablebase 'signature' depends on
+    for smaller in _smaller_signatures(parse_signature(signature)):
+        if smaller not in tables:
+            tables[smaller] = generate(smaller, directory, tables)
+    return tables
+
+
+def generate(signature, directory=None, tables=None, log=None):
+    """
+    Build the tablebase of 'signature', first building or loading the tables it
+    depends on. With a 'directory', tables found there are loaded instead of
+    generated and new ones are saved there as '<signature>.tb'.
+    """
+    signature = _signature_sorted(parse_signature(signature))
+    if tables is None:
+        tables = {}
+    if signature in tables:
+        return tables[signature]
+    path = os.path.join(directory, signature + '.tb') if directory else None
+    if path and os.path.exists(path):
+        tables[signature] = Tablebase.load(path)
+        return tables[signature]
+    _load_needed(signature, tables, directory)
+
+    start = time.perf_counter()
+    tablebase = Tablebase(signature)
+    _retrograde(tablebase, tables)
+    tables[signature] = tablebase
+    if path:
+        os.makedirs(directory, exist_ok=True)
+        tablebase.save(path)
+    if log is not None:
+        log(f'{signature}: {tablebase.size} positions in {time.perf_counter() - start:.1f}s')
+    return tablebase
+
+
+def _retrograde(tablebase, tables):
+    codes = tablebase.codes
+    table = tablebase.table
+    size = tablebase.size
+    game = model.Game()
+    game.castling = 0
+    board = game.board
+    # with no two pieces alike, a move keeps the pieces in signature order
+    ordered = len(set(codes)) == len(codes)
+
+    # plies to mate of positions already decided, by their distance
+    pending = [[]]
+    parents = {}
+    # moves staying in this table that have not been shown to lose, and the
+    # longest mate among the losing moves seen so far
+    open_moves = {}
+    longest = {}
+    draw_escape = set()
+
+    def push(distance, index):
+        while len(pending) <= distance:
+            pending.append([])
+        pending[distance].append(index)
+
+    for index in range(size):
+        squares, white = tablebase._decode(index)
+        if len(set(squares)) != len(squares) or any(
+                code & KIND_MASK == PAWN and sq >> 3 in (0, 7) for code, sq in zip(codes, squares)):
+            table[index] = _INVALID
+            continue
+        placed = [_to88(sq) for sq in squares]
+        for code, sq in zip(codes, placed):
+            board.place(sq, code)
+        game.white_to_play = white
+        if board.in_check(not white):
+            # the side that just moved cannot have left its king in check
+            table[index] = _INVALID
+        else:
+            moves = game.legal_moves(white)
+            if not moves:
+                if board.in_check(white):
+                    push(0, index)
+                else:
+                    draw_escape.add(index)
+            count = 0
+            longest_loss = -1
+            for move in moves:
+                from_sq, to_sq, promotion = unpack_move(move)
+                child = []
+                captured = False
+                for code, sq in zip(codes, placed):
+                    if sq == to_sq:
+                        captured = True
+                    elif sq == from_sq:
+                        child.append(((promotion | code & BLACK) if promotion else code, _to64(to_sq)))
+                    else:
+                        child.append((code, _to64(sq)))
+                if not captured and not promotion:
+                    if ordered:
+                        child_index = tablebase._ordered_index([sq for _, sq in child], not white)
+                    else:
+                        child_index = tablebase.index(child, not white)
+                    parents.setdefault(child_index, []).append(index)
+                    count += 1
+                    continue
+                result = tables[_signature_sorted([code for code, _ in child])]
+                value = _probe_value(result.table[result.index(child, not white)])
+                if value.wdl < 0:
+                    push(value.dtm + 1, index)
+                elif value.wdl == 0:
+                    draw_escape.add(index)
+                else:
+                    longest_loss = max(longest_loss, value.dtm)
+            if moves:
+                open_moves[index] = count
+                longest[index] = longest_loss
+                if count == 0 and index not in draw_escape and longest_loss >= 0:
+                    push(longest_loss + 1, index)
+        for sq in placed:
+            board.clear(sq)
+
+    # Walk outward from the mates, shortest distance first
+    distance = 0
+    while distance < len(pending):
+        for index in pending[distance]:
+            if table[index]:
+                continue
+            table[index] = distance + 1
+            for parent in parents.get(index, ()):
+                if table[parent]:
+                    continue
+                if distance & 1 == 0:
+                    # the parent can move into a lost position: it wins
+                    push(distance + 1, parent)
+                else:
+                    open_moves[parent] -= 1
+                    longest[parent] = max(longest[parent], distance)
+                    if open_moves[parent] == 0 and parent not in draw_escape:
+                        push(longest[parent] + 1, parent)
+        distance += 1
+    return table
+
+
+class Tablebases:
+    """
+    A collection of tablebases: those in 'tables', a dict by signature such as
+    generate() fills, and those saved in 'directory', loaded on first use.
+    """
+
+    def __init__(self, directory=None, tables=None):
+        self.directory = directory
+        self._tables = dict(tables or {})
+
+    def get(self, signature):
+        if signature not in self._tables:
+            path = os.path.join(self.directory, signature + '.tb') if self.directory else None
+            self._tables[signature] = Tablebase.load(path) if path and os.path.exists(path) else None
+        return self._tables[signature]
+
+    def probe(self, game):
+        """Return the Probe for the game's position, or None if no tablebase covers it."""
+        tablebase = self.get(signature_of(game))
+        return tablebase.probe(game) if tablebase is not None else None
+
+    def best_move(self, game):
+        """
+        Return the move that keeps the best result for the side to play, written
+        like 'e2e4': the quickest win, or the slowest loss. None if the position
+        is not covered.
+        """
+        if self.probe(game) is None:
+            return None
+        best = best_key = None
+        for move in game.legal_moves():
+            game._make(move)
+            result = self.probe(game) or Probe(0, None)
+            game._unmake()
+            # the result is the opponent's: a loss for them is best, the quickest first
+            if result.wdl < 0:
+                key = (2, -result.dtm)
+            elif result.wdl == 0:
+                key = (1, 0)
+            else:
+                key = (0, result.dtm)
+            if best_key is None or key > best_key:
+                best, best_key = move, key
+        return model.move_text(best) if best is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.tablebase', description=__doc__.splitlines()[0])
+    parser.add_argument('signatures', nargs='+', help="material signatures such as 'KQK' or 'KPK'")
+    parser.add_argument('--dir', default='tablebases', help='directory the tables are saved in')
+    args = parser.parse_args(argv)
+    tables = {}
+    for signature in args.signatures:
+        tablebase = generate(signature, args.dir, tables, log=print)
+        values = [_probe_value(value) for value in tablebase.table]
+        wins = sum(1 for value in values if value is not None and value.wdl > 0)
+        longest = max((value.dtm for value in values if value is not None and value.dtm is not None), default=0)
+        print(f'{tablebase.signature}: {wins} wins for the side to move, longest mate {longest} plies')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
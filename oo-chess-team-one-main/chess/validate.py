@@ -0,0 +1,158 @@
+"""Bulk game validation across worker processes.
+
+Every game is replayed through Game.accept_move and gets a Verdict: whether
+all its moves were legal, the first illegal ply and why, and the status of
+the last position reached. Games are read lazily, sent to a process pool in
+chunks and their verdicts come back in input order. Only a bounded number of
+chunks is in flight at once, so memory use does not grow with the input.
+Run from the command line with:
+
+    python -m chess.validate games.jsonl --workers 8
+    python -m chess.validate games.pgn --workers 8 > verdicts.jsonl
+
+A JSON lines file holds one game per line: either a list of moves such as
+["e2e4", "e7e5"], or an object {"moves": [...], "fen": ..., "san": ...}
+with an optional starting FEN and "san": true for moves in SAN.
+"""
+import argparse
+from collections import deque, namedtuple
+import concurrent.futures
+import itertools
+import json
+import os
+import sys
+
+import chess.model as model
+import chess.pgn as pgn
+
+# 'ok' is True when every move was legal. 'plies' counts the moves played;
+# 'illegal_ply' is the 1-based number of the first rejected move and 'reason'
+# says why, both None for a legal game. 'status' describes the last position
+# reached as Game.status() gives it, e.g. 'ongoing' or 'checkmate', or
+# 'invalid' when the record itself is broken: bad JSON, a starting FEN that
+# could not be read or a move that is not a move at all.
+Verdict = namedtuple('Verdict', 'ok plies illegal_ply reason status')
+
+DEFAULT_CHUNKSIZE = 64
+
+
+def validate_game(moves, fen=None, san=False):
+    """
+    Replay 'moves' from the start position, or from 'fen', and return a Verdict.
+    Moves are in accept_move form like 'e2e4', or in SAN like 'Nf3' with 'san'.
+    """
+    try:
+        if fen is not None:
+            game = model.Game.from_fen(fen)
+        else:
+            game = model.Game()
+            game.set_up_pieces()
+    except Exception as e:
+        return _invalid(e)
+    if not isinstance(moves, (list, tuple)):
+        return _invalid(f'moves must be a list, not {type(moves).__name__}')
+    for ply, move in enumerate(moves, 1):
+        try:
+            game.accept_move(pgn.san_to_move(game, move) if san else move)
+        except (model.IllegalMoveError, ValueError) as e:
+            return Verdict(False, ply - 1, ply, str(e), game.status())
+        except Exception as e:
+            # a malformed record, e.g. a move that is not a string
+            return _invalid(e, ply)
+    return Verdict(True, len(moves), None, None, game.status())
+
+
+def _invalid(error, ply=None):
+    # Verdict for a game record that cannot be replayed at all
+    reason = error if isinstance(error, str) else f'{type(error).__name__}: {error}'
+    return Verdict(False, 0 if ply is None else ply - 1, ply, reason, 'invalid')
+
+
+def _validate_chunk(chunk):
+    # Worker entry point: chunk is a list of (moves, fen, san) tasks, or of
+    # Verdicts already given by the reader to records it could not parse
+    return [task if isinstance(task, Verdict) else validate_game(*task) for task in chunk]
+
+
+def validate_games(games, workers=None, chunksize=DEFAULT_CHUNKSIZE, max_pending=None):
+    """
+    Validate an iterable of (moves, fen, san) tasks with 'workers' processes
+    (default: one per CPU), and yield a Verdict for each in the same order.
+    A Verdict in place of a task, as read_jsonl gives for a bad line, is passed on. The
+    input is read 'chunksize' games at a time and at most 'max_pending' chunks
+    (default: two per worker) are queued, so a slow consumer holds back the reader.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    games = iter(games)
+    chunks = iter(lambda: list(itertools.islice(games, chunksize)), [])
+    if workers == 1:
+        for chunk in chunks:
+            yield from _validate_chunk(chunk)
+        return
+    if max_pending is None:
+        max_pending = workers * 2
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_validate_chunk, chunk))
+            if len(pending) >= max_pending:
+                # wait for the oldest chunk before reading more input
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def read_jsonl(stream):
+    """
+    Yield (moves, fen, san) tasks from JSON lines, one game per line. A line that
+    is not a game record yields an 'invalid' Verdict in its place.
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield _invalid(f'bad JSON: {e}')
+            continue
+        if isinstance(record, list):
+            yield record, None, False
+        elif isinstance(record, dict):
+            yield record.get('moves', []), record.get('fen'), bool(record.get('san', False))
+        else:
+            yield _invalid(f'expected a list or an object, not {type(record).__name__}')
+
+
+def read_pgn(stream):
+    """Yield (moves, fen, san) tasks for the games of a PGN stream."""
+    for game in pgn.read_games(stream):
+        yield list(game.san_moves()), game.headers.get('FEN'), True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m chess.validate', description=__doc__.splitlines()[0])
+    parser.add_argument('file', help="games to validate, or '-' for standard input")
+    parser.add_argument('--format', choices=['jsonl', 'pgn'], default=None,
+                        help='input format (default: pgn for .pgn files, else jsonl)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNKSIZE, help='games sent to a worker at a time')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('pgn' if args.file.endswith('.pgn') else 'jsonl')
+    reader = read_pgn if fmt == 'pgn' else read_jsonl
+    stream = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8', errors='replace')
+    illegal = 0
+    try:
+        for number, verdict in enumerate(validate_games(reader(stream), args.workers, args.chunk), 1):
+            illegal += not verdict.ok
+            print(json.dumps(dict(game=number, **verdict._asdict())))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return 1 if illegal else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
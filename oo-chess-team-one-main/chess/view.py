@@ -1,24 +1,37 @@
+from functools import lru_cache
+import sys
 from typing import Optional
 
 import chess.model as model
 
+_FILES = '    a   b   c   d   e   f   g   h'
+_BORDER = '  +---+---+---+---+---+---+---+---+'
+
+# Size of board_to_text's drawing in terminal lines and columns
+BOARD_HEIGHT = 19
+BOARD_WIDTH = len(_BORDER)
+
+
 def board_to_text(board: model.Board) -> str:
-    ans = ['    a   b   c   d   e   f   g   h']
-    ans.append('  +---+---+---+---+---+---+---+---+')  # Top border of the board
+    squares = board._squares
+    ans = [_FILES]
+    ans.append(_BORDER)  # Top border of the board
 
-    for i in range(8, 0, -1):
-        row = f'{i} |'
-        for col in 'abcdefgh':
-            piece = board.get(f'{col}{i}')
-            val = piece_to_char(piece)
-            row += f' {val} |'
-        ans.append(row)
-        ans.append('  +---+---+---+---+---+---+---+---+')  # Border between rows
+    for rank in range(7, -1, -1):
+        ans.append(_rank_to_text(rank, bytes(squares[rank * 16:rank * 16 + 8])))
+        ans.append(_BORDER)  # Border between rows
 
-    ans.append('    a   b   c   d   e   f   g   h')  # Bottom coordinate labels
+    ans.append(_FILES)  # Bottom coordinate labels
 
     return '\n'.join(ans) + '\n'
 
+
+@lru_cache(maxsize=4096)
+def _rank_to_text(rank: int, codes: bytes) -> str:
+    # One rank of the board, from the piece codes on its eight squares
+    return f'{rank + 1} |' + ''.join(f' {_CODE_CHARS[code]} |' for code in codes)
+
+
 _PIECE_UNICODES = {
     'Queen': {True: "\u2655", False: "\u265B"},
     'King': {True: "\u2654", False: "\u265A"},
@@ -33,4 +46,87 @@ def piece_to_char(piece: Optional[model.Piece]) -> str:
         return ' '
     return _PIECE_UNICODES[type(piece).__name__][piece._is_white]
 
-    
\ No newline at end of file
+# The character of each piece code
+_CODE_CHARS = [piece_to_char(model.piece_from_code(code)) if model.PAWN <= code & model.KIND_MASK <= model.KING else ' '
+               for code in range(16)]
+
+
+class BoardRenderer:
+    """
+    Draws a board at a fixed place of an ANSI terminal, 'top' and 'left' being
+    the 1-based line and column of its top left corner. The first frame draws
+    the whole board; after that only the squares that changed are redrawn, each
+    with a cursor-addressing escape sequence, and ranks that did not change are
+    skipped with a single comparison.
+    """
+
+    def __init__(self, top=1, left=1):
+        self.top = top
+        self.left = left
+        self._last = None
+
+    def reset(self):
+        # Draw the whole board again on the next frame, e.g. after the screen was cleared
+        self._last = None
+
+    def render(self, board: model.Board) -> str:
+        """Return the escape sequences that bring the drawing up to date with 'board'."""
+        squares = bytes(board._squares)
+        last = self._last
+        self._last = squares
+        if last is None:
+            lines = board_to_text(board).splitlines()
+            return ''.join(f'\x1b[{self.top + i};{self.left}H{line}' for i, line in enumerate(lines))
+        if squares == last:
+            return ''
+        updates = []
+        for rank in range(8):
+            start = rank * 16
+            if squares[start:start + 8] == last[start:start + 8]:
+                continue
+            line = self.top + 2 + 2 * (7 - rank)
+            for sq in range(start, start + 8):
+                if squares[sq] != last[sq]:
+                    updates.append(f'\x1b[{line};{self.left + 4 + 4 * (sq & 7)}H{_CODE_CHARS[squares[sq]]}')
+        return ''.join(updates)
+
+
+class BoardGrid:
+    """
+    Many boards drawn in a grid of 'columns' boards per row, below and to the
+    right of 'top' and 'left'. Each frame is sent to 'out' with a single write.
+    """
+
+    def __init__(self, columns, out=sys.stdout, top=1, left=1):
+        self.columns = columns
+        self.out = out
+        self.top = top
+        self.left = left
+        self._renderers = []
+
+    def frame(self, boards) -> str:
+        """Return the text of the next frame for 'boards', '' if nothing changed."""
+        renderers = self._renderers
+        parts = []
+        for i, board in enumerate(boards):
+            if i == len(renderers):
+                row, column = divmod(i, self.columns)
+                renderers.append(BoardRenderer(self.top + row * (BOARD_HEIGHT + 1),
+                                               self.left + column * (BOARD_WIDTH + 2)))
+            parts.append(renderers[i].render(board))
+        text = ''.join(parts)
+        if text:
+            # leave the cursor below the grid
+            rows = (len(renderers) + self.columns - 1) // self.columns
+            text += f'\x1b[{self.top + rows * (BOARD_HEIGHT + 1)};1H'
+        return text
+
+    def draw(self, boards):
+        text = self.frame(boards)
+        if text:
+            self.out.write(text)
+            self.out.flush()
+
+    def reset(self):
+        for renderer in self._renderers:
+            renderer.reset()
@@ -0,0 +1,39 @@
+from chess.model import Game
+from chess.perft import POSITIONS, position, divide
+from chess.analyze import analyze, NODES, CHECKMATES
+
+def test_parallel_matches_divide():
+    game = position('kiwipete')
+    results = analyze(game, 2, workers=2)
+    assert {move: counts[NODES] for move, counts in results.items()} == dict(divide(game, 2))
+
+def test_split_deeper_than_one_ply():
+    results = analyze(position('start'), 3, workers=2, split_depth=2)
+    assert sum(counts[NODES] for counts in results.values()) == POSITIONS['start'][1][3]
+    assert len(results) == 20
+
+def test_mate_scan():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['f2f3', 'e7e5', 'g2g4']:
+        game.accept_move(move)
+    results = analyze(game, 1, workers=1, mates=True)
+    assert results['d8h4'] == [1, 1, 1]
+    assert sum(counts[CHECKMATES] for counts in results.values()) == 1
+    # the game itself is left where it was
+    assert len(game.move_history) == 3
+
+def test_mate_inside_the_split_depth():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['f2f3', 'e7e5', 'g2g4']:
+        game.accept_move(move)
+    results = analyze(game, 2, workers=1, split_depth=2)
+    assert {move: counts[NODES] for move, counts in results.items()} == dict(divide(game, 2))
+    assert len(results) == 30 and results['d8h4'] == [0, 0, 0]
+
+def test_snapshot_round_trip():
+    game = position('talkchess')
+    copy = Game.from_snapshot(game.snapshot())
+    assert copy.position_key == game.position_key
+    assert copy.snapshot() == game.snapshot()
@@ -19,3 +19,31 @@ def test_undo_move():
     # After undo, e2 should have the white pawn back, and e4 should be empty
     assert isinstance(game.board.get('e2'), Pawn)
     assert game.board.get('e4') is None
+
+def test_undo_capture_and_castle():
+    game = Game(debug=True)
+    game.board.set('d1', King(is_white=True))
+    game.board.set('h1', Rook(is_white=True))
+    game.board.set('c2', Knight(is_white=True))
+    game.board.set('d4', Pawn(is_white=False))
+
+    game.accept_move('c2d4')
+    game.accept_move('d1f1')
+    assert game.board.get('e1') == Rook(is_white=True)
+
+    game.undo_move()
+    assert game.board.get('d1') == King(is_white=True)
+    assert game.board.get('h1') == Rook(is_white=True)
+    assert game.board.get('e1') is None and game.board.get('f1') is None
+
+    game.undo_move()
+    assert game.board.get('d4') == Pawn(is_white=False)
+    assert game.board.get('c2') == Knight(is_white=True)
+    assert game.white_to_play
+
+def test_rejected_move_is_not_recorded():
+    game = Game()
+    game.set_up_pieces()
+    with pytest.raises(Exception):
+        game.accept_move('e2e5')
+    assert not game.move_history
@@ -0,0 +1,62 @@
+import pytest
+from chess.model import Game, Queen, King, Rook
+from chess.model import move_text
+from chess.perft import POSITIONS, position
+from chess.bitboard import rook_attacks, bishop_attacks, KNIGHT_ATTACKS
+
+def test_slider_attacks_stop_at_first_blocker():
+    # rook on a1 with a blocker on a4: it sees a2, a3, a4 and the whole first rank
+    attacks = rook_attacks(0, 1 << 24)
+    assert attacks == (1 << 8) | (1 << 16) | (1 << 24) | 0xfe
+    # bishop on d4 on an empty board sees 13 squares
+    assert bin(bishop_attacks(27, 0)).count('1') == 13
+    assert bin(KNIGHT_ATTACKS[0]).count('1') == 2
+    # rook on h8 hemmed in on g8 and h5
+    assert rook_attacks(63, (1 << 62) | (1 << 39)) == (1 << 62) | (1 << 55) | (1 << 47) | (1 << 39)
+
+def test_bitboard_moves_match_board_moves():
+    moves = ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1b5', 'a7a6', 'b5c6', 'd7c6']
+    game = Game()
+    bb_game = Game(bitboards=True)
+    game.set_up_pieces()
+    bb_game.set_up_pieces()
+    for move in moves:
+        assert sorted(game.generate_legal_moves(game.white_to_play)) == sorted(bb_game.generate_legal_moves(bb_game.white_to_play))
+        game.accept_move(move)
+        bb_game.accept_move(move)
+
+def test_bitboard_check_and_checkmate():
+    game = Game(bitboards=True)
+    game.set_up_pieces()
+    for move in ['f2f3', 'e7e5', 'g2g4', 'd8h4']:
+        game.accept_move(move)
+    assert game.is_check(True)
+    assert game.is_checkmate(True)
+
+def test_bitboard_pinned_piece_cannot_move():
+    game = Game(debug=True, bitboards=True)
+    game.board.set('e1', King(is_white=True))
+    game.board.set('e2', Rook(is_white=True))
+    game.board.set('e8', Queen(is_white=False))
+    moves = game.generate_legal_moves(True)
+    assert ('e2', 'd2') not in moves
+    assert ('e2', 'e8') in moves
+
+@pytest.mark.parametrize('name', sorted(POSITIONS))
+def test_bitboard_moves_match_board_moves_in_perft_positions(name):
+    game = position(name)
+    bb_game = position(name, bitboards=True)
+    assert sorted(game.legal_moves()) == sorted(bb_game.legal_moves())
+    for move in game.legal_moves():
+        game.push(move)
+        bb_game.push(move)
+        assert sorted(game.legal_moves()) == sorted(bb_game.legal_moves()), move_text(move)
+        game.pop()
+        bb_game.pop()
+
+def test_bitboard_en_passant_exposing_the_king():
+    # taking en passant would leave both pawns off the fifth rank and the king in check
+    game = Game.from_fen('8/8/8/K2pP2q/8/8/8/7k w - d6 0 1', bitboards=True)
+    assert ('e5', 'd6') not in game.generate_legal_moves(True)
+    game = Game.from_fen('8/8/8/K2pP3/8/8/8/7k w - d6 0 1', bitboards=True)
+    assert ('e5', 'd6') in game.generate_legal_moves(True)
@@ -1,5 +1,5 @@
 import pytest
-from chess.model import Board, Pawn
+from chess.model import Board, Pawn, Knight, Rook, King, KNIGHT, ROOK, BLACK, square, square_name
 
 # Ensure that the board is initialized correctly
 def test_board_ctor():
@@ -7,3 +7,42 @@ def test_board_ctor():
     board.set('e2', Pawn(is_white=True))
     assert board.get('e2') == Pawn(is_white=True)
     assert board.get('e4') == None
+
+# Ensure that the string API and the integer-square API see the same board
+def test_board_integer_squares():
+    board = Board()
+    board.set('e4', Knight(is_white=False))
+    assert board.code_at(square('e4')) == KNIGHT | BLACK
+    board.place(square('a1'), ROOK)
+    assert board.get('a1') == Rook(is_white=True)
+    board.remove('e4')
+    assert board.get('e4') is None
+    assert square_name(square('h8')) == 'h8'
+
+# Ensure that the board keeps track of the kings as they move and are removed
+def test_board_tracks_kings():
+    board = Board()
+    assert board.king_square(True) is None
+    board.set('e1', King(is_white=True))
+    board.set('e8', King(is_white=False))
+    assert board.king_square(True) == square('e1')
+    board.set('f1', King(is_white=True))
+    board.remove('f1')
+    assert board.king_square(True) == square('e1')
+    board.remove('e1')
+    assert board.king_square(True) is None
+    assert board.king_square(False) == square('e8')
+
+# Ensure that attacks are found from the target square outward and blocked by pieces
+def test_board_is_attacked():
+    board = Board()
+    board.set('e8', King(is_white=False))
+    board.set('a8', Rook(is_white=True))
+    assert board.is_attacked(square('e8'), by_white=True)
+    assert board.in_check(False)
+    board.set('c8', Knight(is_white=False))
+    assert not board.in_check(False)
+    assert board.is_attacked(square('d6'), by_white=False)
+    board.set('d7', Pawn(is_white=True))
+    assert board.is_attacked(square('c8'), by_white=True)
+    assert not board.is_attacked(square('d8'), by_white=True)
@@ -0,0 +1,81 @@
+import random
+import struct
+import pytest
+from chess.model import Game, START_FEN, ZOBRIST_RANDOMS
+from chess.perft import POSITIONS, position
+from chess.book import Book, write_book, polyglot_key, load_randoms, encode_move, decode_move
+
+@pytest.fixture
+def book(tmp_path):
+    start = Game.from_fen(START_FEN)
+    after_e4 = Game.from_fen('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1')
+    castles = Game.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    path = tmp_path / 'book.bin'
+    write_book(path, [(start, 'd2d4', 5), (start, 'e2e4', 10), (start, 'g1f3', 1),
+                      (after_e4, 'c7c5', 3), (castles, 'e1g1', 2), (castles, 'e1c1', 1)])
+    with Book(path) as book:
+        yield book
+
+def test_lookup(book):
+    game = Game()
+    game.set_up_pieces()
+    assert len(book) == 6
+    assert [entry.move for entry in book.entries(game)] == ['e2e4', 'd2d4', 'g1f3']
+    assert book.pick(game) == 'e2e4'
+    game.accept_move(book.pick(game))
+    assert book.pick(game) == 'c7c5'
+    game.accept_move('c7c5')
+    assert book.pick(game) is None and book.entries(game) == []
+
+def test_weighted_pick(book):
+    game = Game.from_fen(START_FEN)
+    rng = random.Random(1)
+    picks = [book.pick(game, weighted=True, rng=rng) for _ in range(400)]
+    assert set(picks) == {'e2e4', 'd2d4', 'g1f3'}
+    assert picks.count('e2e4') > picks.count('d2d4') > picks.count('g1f3')
+
+def test_castling_moves(book):
+    game = Game.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    assert [entry.move for entry in book.entries(game)] == ['e1g1', 'e1c1']
+    # written as the king taking its rook
+    assert encode_move(game, 'e1g1') == (0 << 9 | 4 << 6 | 0 << 3 | 7)
+    assert decode_move(game, encode_move(game, 'e1c1')) == 'e1c1'
+    game.accept_move('e1g1')
+
+@pytest.mark.parametrize('name', sorted(POSITIONS))
+def test_key_from_a_loaded_table(tmp_path, name):
+    path = tmp_path / 'randoms.bin'
+    path.write_bytes(struct.pack('>781Q', *ZOBRIST_RANDOMS))
+    randoms = load_randoms(path)
+    game = position(name)
+    assert polyglot_key(game, list(randoms)) == game.position_key
+
+def test_empty_book(tmp_path):
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+    with Book(path) as book:
+        assert book.pick(Game.from_fen(START_FEN)) is None
+
+# Keys given in the Polyglot book format specification
+@pytest.mark.parametrize('moves, key', [
+    ([], 0x463b96181691fc9c),
+    (['e2e4'], 0x823c9b50fd114196),
+    (['e2e4', 'd7d5'], 0x0756b94461c50fb0),
+    (['e2e4', 'd7d5', 'e4e5'], 0x662fafb965db29d4),
+    (['e2e4', 'd7d5', 'e4e5', 'f7f5'], 0x22a48b5a8e47ff78),
+    (['e2e4', 'd7d5', 'e4e5', 'f7f5', 'e1e2'], 0x652a607ca3f242c1),
+    (['a2a4', 'b7b5', 'h2h4', 'b5b4', 'c2c4'], 0x3c8123ea7b067637),
+])
+def test_standard_polyglot_keys(moves, key):
+    game = Game.from_fen(START_FEN)
+    for move in moves:
+        game.accept_move(move)
+    assert game.position_key == key
+    assert polyglot_key(game) == key
+
+def test_reads_a_standard_polyglot_entry(tmp_path):
+    # an entry as other Polyglot tools write it: e2e4 from the start position
+    path = tmp_path / 'polyglot.bin'
+    path.write_bytes(struct.pack('>QHHI', 0x463b96181691fc9c, 1 << 9 | 4 << 6 | 3 << 3 | 4, 7, 0))
+    with Book(path) as book:
+        assert book.pick(Game.from_fen(START_FEN)) == 'e2e4'
@@ -1,5 +1,5 @@
 import pytest
-from chess.model import Game, Bishop, Rook, Queen, Knight, Pawn, King, Board
+from chess.model import Game, Bishop, Rook, Queen, Knight, Pawn, King, Board, START_FEN
 
 # Sample function to set up a board in a specific configuration
 
@@ -26,4 +26,95 @@ def test_not_checkmate_but_in_check():
 def test_not_checkmate_not_in_check():
     game = Game()
     setup_board(game, ['e2e4', 'e7e5']) # Game has just started, no check
-    assert game.is_checkmate(False) == False
\ No newline at end of file
+    assert game.is_checkmate(False) == False
+
+
+def test_pinned_piece_moves_only_along_pin():
+    game = Game(debug=True)
+    game.board.set('e1', King(is_white=True))
+    game.board.set('e3', Rook(is_white=True))
+    game.board.set('e7', Queen(is_white=False))
+    game.board.set('b4', Bishop(is_white=True))
+    moves = game.generate_legal_moves(True)
+    assert ('e3', 'e7') in moves and ('e3', 'e5') in moves
+    assert ('e3', 'd3') not in moves
+
+def test_check_evasions_and_double_check():
+    game = Game(debug=True)
+    game.board.set('e1', King(is_white=True))
+    game.board.set('e8', Rook(is_white=False))
+    game.board.set('a4', Rook(is_white=True))
+    game.board.set('b2', Knight(is_white=True))
+    moves = game.generate_legal_moves(True)
+    # the rook can block on e4, the knight has no square on the e-file
+    assert ('a4', 'e4') in moves and ('a4', 'a5') not in moves
+    assert not [move for move in moves if move[0] == 'b2']
+
+    game.board.set('d3', Knight(is_white=False))
+    assert all(move[0] == 'e1' for move in game.generate_legal_moves(True))
+
+def test_status():
+    assert Game.from_fen('k7/8/2K5/8/8/8/8/7Q w - - 0 1').status() == 'ongoing'
+    assert Game.from_fen('k6Q/8/1K6/8/8/8/8/8 b - - 0 1').status() == 'checkmate'
+    assert Game.from_fen('k7/8/1Q6/8/8/8/8/7K b - - 0 1').status() == 'stalemate'
+
+def test_iter_legal_moves_is_lazy():
+    game = Game()
+    game.set_up_pieces()
+    moves = game.iter_legal_moves()
+    first = next(moves)
+    assert first in game.generate_legal_moves(True)
+    moves.close()
+    # stopping early leaves the board as it was
+    assert game.to_fen() == START_FEN
+    assert sorted(game.iter_legal_moves(False)) == sorted(game.generate_legal_moves(False))
+    assert game.has_legal_move() and game.has_legal_move(False)
+
+def test_threefold_repetition():
+    game = Game()
+    game.set_up_pieces()
+    shuffle = ['g1f3', 'g8f6', 'f3g1', 'f6g8']
+    for move in shuffle:
+        game.accept_move(move)
+    assert game.repetitions() == 2 and game.status() == 'ongoing'
+    for move in shuffle:
+        game.accept_move(move)
+    assert game.repetitions() == 3 and game.status() == 'repetition'
+    game.undo_move()
+    assert game.status() == 'ongoing'
+    # a pawn move makes the earlier positions unreachable
+    game.accept_move('f6g8')
+    game.accept_move('e2e4')
+    for move in ['g8f6', 'g1f3', 'f6g8', 'f3g1']:
+        game.accept_move(move)
+    assert game.repetitions() == 2
+
+def test_same_placement_with_other_rights_is_not_a_repetition():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['e2e4', 'e7e5'] + ['e1e2', 'e8e7', 'e2e1', 'e7e8'] * 2:
+        game.accept_move(move)
+    # the first time round the kings could still castle
+    assert game.repetitions() == 2
+
+def test_fifty_move_rule():
+    game = Game.from_fen('k7/8/8/8/8/8/8/R6K w - - 98 80')
+    assert game.status() == 'ongoing'
+    game.accept_move('a1b1')
+    game.accept_move('a8a7')
+    assert game.halfmove_clock == 100 and game.status() == 'fifty-move'
+    game.undo_move()
+    assert game.status() == 'ongoing'
+    # mate on the last move still counts as mate
+    game = Game.from_fen('k7/8/1K6/8/8/8/8/7R w - - 99 80')
+    game.accept_move('h1h8')
+    assert game.status() == 'checkmate'
+
+def test_repetition_check_leaves_the_game_alone():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8'] * 2:
+        game.accept_move(move)
+    history = game.move_history.tobytes()
+    assert game.status() == 'repetition'
+    assert game.move_history.tobytes() == history and game.to_fen().startswith(START_FEN[:-4])
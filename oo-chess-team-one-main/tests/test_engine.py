@@ -0,0 +1,76 @@
+import time
+import pytest
+from chess.model import Game, King, Queen, Rook, Knight, pack_move
+from chess.engine import search, MATE, TranspositionTable, EXACT, LOWER
+
+def test_finds_mate_in_one():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['f2f3', 'e7e5', 'g2g4']:
+        game.accept_move(move)
+    result = search(game, max_depth=3)
+    assert result.move == 'd8h4'
+    assert result.score == MATE - 1
+    # the game itself is not changed by the search
+    assert len(game.move_history) == 3
+
+def test_takes_hanging_queen():
+    game = Game()
+    game.board.set('e1', King(is_white=True))
+    game.board.set('e8', King(is_white=False))
+    game.board.set('a1', Rook(is_white=True))
+    game.board.set('a6', Queen(is_white=False))
+    game.board.set('h6', Knight(is_white=False))
+    result = search(game, max_depth=2)
+    assert result.move == 'a1a6'
+    assert result.pv[0] == 'a1a6' and result.depth == 2 and result.nodes > 0
+
+def test_respects_time_limit():
+    game = Game()
+    game.set_up_pieces()
+    start = time.perf_counter()
+    result = search(game, time_limit=0.3)
+    assert time.perf_counter() - start < 1.0
+    assert result.move is not None and result.depth >= 1
+
+def test_no_legal_moves():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['f2f3', 'e7e5', 'g2g4', 'd8h4']:
+        game.accept_move(move)
+    result = search(game, max_depth=2)
+    assert result.move is None and result.score == -MATE
+
+def test_table_round_trip_and_replacement():
+    table = TranspositionTable(1)
+    key = 0x123456789abcdef
+    assert table.probe(key) is None
+    table.store(key, pack_move(0x14, 0x34), -MATE + 3, 5, EXACT)
+    assert table.probe(key) == (pack_move(0x14, 0x34), -MATE + 3, 5, EXACT)
+    # a shallower result for another position in the bucket keeps the deep one
+    other = key + (table.entries << 4)
+    table.store(other, pack_move(0x01, 0x22), 40, 1, LOWER)
+    assert table.probe(key)[2] == 5
+    assert table.probe(other) == (pack_move(0x01, 0x22), 40, 1, LOWER)
+
+def test_shared_table_is_visible_to_attached_tables():
+    table = TranspositionTable(1, shared=True)
+    try:
+        table.store(42, pack_move(0x14, 0x34), 17, 3, EXACT)
+        attached = TranspositionTable.attach(table.name)
+        assert attached.probe(42) == (pack_move(0x14, 0x34), 17, 3, EXACT)
+        table.stop()
+        assert attached.stopped
+        attached.close()
+    finally:
+        table.close()
+        table.unlink()
+
+def test_parallel_search_finds_mate():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['f2f3', 'e7e5', 'g2g4']:
+        game.accept_move(move)
+    assert game.best_move(time_limit=5, workers=2, max_depth=3) == 'd8h4'
+    result = search(game, max_depth=3, workers=2)
+    assert result.score == MATE - 1 and result.nodes > 0
@@ -0,0 +1,67 @@
+import pytest
+from chess.model import Game, START_FEN, square, WHITE_KINGSIDE, BLACK_QUEENSIDE
+from chess.perft import POSITIONS
+
+def test_start_position():
+    game = Game()
+    game.set_up_pieces()
+    assert game.to_fen() == START_FEN
+    assert Game.from_fen(START_FEN).position_key == game.position_key
+
+@pytest.mark.parametrize('name', [name for name, (fen, _) in POSITIONS.items() if fen])
+def test_round_trip(name):
+    fen = POSITIONS[name][0]
+    assert Game.from_fen(fen).to_fen() == fen
+    assert Game.from_fen(fen, bitboards=True).to_fen() == fen
+
+def test_fields():
+    game = Game.from_fen('r3k3/8/8/3pP3/8/8/8/4K2R w Kq d6 3 27')
+    assert game.white_to_play
+    assert game.castling == WHITE_KINGSIDE | BLACK_QUEENSIDE
+    assert game.ep_square == square('d6')
+    assert (game.halfmove_clock, game.fullmove_number) == (3, 27)
+    assert 'e5d6' in [f + t for f, t in game.generate_legal_moves(True)]
+
+def test_clocks_follow_moves():
+    game = Game.from_fen(START_FEN)
+    for move in ['g1f3', 'b8c6', 'f3g1']:
+        game.accept_move(move)
+    assert game.to_fen().endswith(' b KQkq - 3 2')
+    game.accept_move('e7e5')
+    assert game.to_fen() == 'r1bqkbnr/pppp1ppp/2n5/4p3/8/8/PPPPPPPP/RNBQKBNR w KQkq e6 0 3'
+    for _ in range(4):
+        game.undo_move()
+    assert game.to_fen() == START_FEN
+
+def test_clocks_are_optional():
+    game = Game.from_fen('8/8/8/8/8/8/8/K6k b - -')
+    assert game.to_fen() == '8/8/8/8/8/8/8/K6k b - - 0 1'
+
+@pytest.mark.parametrize('fen', [
+    '8/8/8/8/8/8/8/K6k x - - 0 1',
+    '8/8/8/8/8/8/K6k b - - 0 1',
+    '8/8/8/8/8/8/8/K7k b - - 0 1',
+    '8/8/8/8/8/8/8/K5xk b - - 0 1',
+    '8/8/8/8/8/8/8/K6k b - z9 0 1',
+    '8/8/8/8/8/8/8/K6k b',
+    '8/8/8/8/8/8/8/K6k b - - -1 1',
+    '8/8/8/8/8/8/8/K6k b - - 0 -1',
+    '8/8/8/8/8/8/8/K6k b - - 268435456 1',
+])
+def test_invalid_fen(fen):
+    with pytest.raises(ValueError):
+        Game.from_fen(fen)
+
+@pytest.mark.parametrize('fen', ['4k3/8/8/8/8/8/8/4K3 w - a1 0 1', '4k3/8/8/8/8/8/8/4K3 w - e3 0 1',
+                                 '4k3/8/8/8/8/8/8/4K3 b - e6 0 1'])
+def test_en_passant_square_must_be_on_the_skipped_rank(fen):
+    with pytest.raises(ValueError):
+        Game.from_fen(fen)
+
+def test_undo_restores_en_passant_square():
+    fen = 'rnbqkbnr/ppp1pppp/8/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3'
+    game = Game.from_fen(fen)
+    game.accept_move('g1f3')
+    assert game.ep_square is None
+    game.undo_move()
+    assert game.to_fen() == fen
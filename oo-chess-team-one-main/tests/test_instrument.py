@@ -0,0 +1,47 @@
+import pytest
+from chess import instrument
+from chess.model import Game
+
+@pytest.fixture(autouse=True)
+def clean():
+    instrument.reset()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+def test_off_by_default_and_restored():
+    plain = Game.__dict__['accept_move']
+    assert not instrument.enabled()
+    instrument.enable()
+    assert Game.__dict__['accept_move'] is not plain
+    instrument.disable()
+    assert Game.__dict__['accept_move'] is plain
+    game = Game()
+    game.set_up_pieces()
+    game.accept_move('e2e4')
+    assert Game.stats() == {}
+
+def test_counts_calls_and_copies():
+    instrument.enable()
+    game = Game()
+    game.set_up_pieces()
+    game.accept_move('e2e4')
+    game.generate_legal_moves(False)
+    game.board.deep_copy()
+    with pytest.raises(Exception):
+        game.accept_move('e7e4')
+    stats = Game.stats()
+    assert stats['accept_move'].calls == 2
+    assert sum(stats['accept_move'].histogram) == 2
+    assert stats['generate_legal_moves'].calls == 1
+    assert stats['accept_move'].copies == 0
+    assert 'is_checkmate' not in stats
+
+def test_profile_toggle():
+    instrument.enable(profile=True)
+    game = Game()
+    game.set_up_pieces()
+    game.accept_move('e2e4')
+    instrument.disable()
+    assert instrument.profile_stats() is not None
+    assert 'accept_move' in instrument.report()
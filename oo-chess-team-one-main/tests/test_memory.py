@@ -0,0 +1,13 @@
+import pytest
+from chess.model import Game
+from chess.memory import measure
+
+def test_games_have_no_dict():
+    game = Game()
+    with pytest.raises(AttributeError):
+        game.notes = 'games have no __dict__'
+
+def test_memory_footprint():
+    # a ply costs an 8 byte undo record and the 8 byte key kept for repetitions
+    per_game, per_ply = measure(games=200, plies=20)
+    assert per_game < 2000 and per_ply < 24
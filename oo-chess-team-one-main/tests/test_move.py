@@ -1,5 +1,6 @@
 import pytest
-from chess.model import Game, Bishop, Rook, Queen, Knight, Pawn, King, Board
+from array import array
+from chess.model import Game, Bishop, Rook, Queen, Knight, Pawn, King, Board, square, pack_move, unpack_move, move_text, MOVE_CASTLE, MOVE_EN_PASSANT, QUEEN, KNIGHT, EMPTY, MOVE_CACHE
 
 @pytest.fixture(autouse=True)
 def game():
@@ -234,3 +235,99 @@ def test_castling_black_king_move_left(game):
 
 
 
+
+@pytest.mark.parametrize('text', ['e2e4', 'a1h8', 'h7h8q', 'b2a1n', 'g7g8r', 'c7c8b'])
+def test_packed_move_round_trip(game, text):
+    move = game.parse_move(text)
+    assert 0 <= move < 1 << 16
+    assert move_text(move) == text
+
+def test_pack_and_unpack(game):
+    move = pack_move(square('e7'), square('e8'), QUEEN)
+    assert unpack_move(move) == (square('e7'), square('e8'), QUEEN)
+    assert unpack_move(pack_move(square('b7'), square('a8'), KNIGHT)) == (square('b7'), square('a8'), KNIGHT)
+    assert unpack_move(pack_move(square('e2'), square('e4'))) == (square('e2'), square('e4'), EMPTY)
+
+def test_generated_moves_are_packed_and_flagged():
+    game = Game.from_fen('r3k3/8/8/3pP3/8/8/8/4K2R w Kq d6 0 1')
+    moves = game.legal_moves()
+    assert isinstance(moves, array) and moves.typecode == 'H'
+    assert pack_move(square('e5'), square('d6'), EMPTY, MOVE_EN_PASSANT) in moves
+    assert pack_move(square('e1'), square('g1'), EMPTY, MOVE_CASTLE) in moves
+    assert game.parse_move('e1g1') == pack_move(square('e1'), square('g1'), EMPTY, MOVE_CASTLE)
+
+def test_push_and_pop():
+    game = Game()
+    game.set_up_pieces()
+    game.push(game.parse_move('e2e4'))
+    assert game.board.get('e4') == Pawn(is_white=True)
+    with pytest.raises(Exception):
+        game.push(game.parse_move('e4e5'))
+    game.pop()
+    assert game.board.get('e2') == Pawn(is_white=True)
+    assert not game.move_history
+    with pytest.raises(IndexError):
+        game.pop()
+
+def test_move_cache_hits_and_eviction():
+    cache = MOVE_CACHE
+    saved = cache.max_bytes
+    cache.clear()
+    try:
+        game = Game()
+        game.set_up_pieces()
+        before = cache.info()
+        first = game.generate_legal_moves(True)
+        assert game.generate_legal_moves(True) == first
+        info = cache.info()
+        assert (info.hits - before.hits, info.misses - before.misses, info.entries) == (1, 1, 1)
+        # another game at the same position shares the entry
+        other = Game.from_fen(game.to_fen())
+        other.generate_legal_moves(True)
+        assert cache.info().hits == info.hits + 1
+        # a cap too small for a single entry evicts it
+        cache.resize(1)
+        assert len(cache) == 0 and cache.info().evictions > info.evictions
+    finally:
+        cache.resize(saved)
+        cache.clear()
+
+def test_move_cache_follows_board_set():
+    game = Game()
+    game.set_up_pieces()
+    assert len(game.generate_legal_moves(True)) == 20
+    game.board.set('b1', None)
+    moves = game.generate_legal_moves(True)
+    assert len(moves) == 19 and ('a1', 'b1') in moves
+    game.board.set('b1', Knight(True))
+    assert len(game.generate_legal_moves(True)) == 20
+
+def test_status_does_not_skew_cache_counters():
+    MOVE_CACHE.clear()
+    game = Game()
+    game.set_up_pieces()
+    before = MOVE_CACHE.info()
+    for _ in range(5):
+        assert game.status() == 'ongoing'
+    assert MOVE_CACHE.info() == before
+    game.generate_legal_moves(True)
+    assert game.status() == 'ongoing'
+    info = MOVE_CACHE.info()
+    assert (info.hits - before.hits, info.misses - before.misses, info.entries) == (0, 1, 1)
+    MOVE_CACHE.clear()
+
+def test_public_checks_take_pieces_and_square_names():
+    game = Game()
+    game.set_up_pieces()
+    assert game.is_legal_move(Pawn(True), 'e2', 'e4')
+    assert not game.is_legal_move(Pawn(True), 'e2', 'e5')
+    # the piece must be on the starting square
+    assert not game.is_legal_move(Pawn(True), 'c4', 'c5')
+    assert not game.is_legal_move(Pawn(False), 'e2', 'e4')
+    assert game.can_attack(Knight(True), 'g1', 'f3')
+    assert not game.can_attack(Rook(True), 'a1', 'a3')
+    assert game.can_piece_attack(Bishop(False), 'c8', 'b7')
+    assert not game.is_path_clear('a1', 'a3', 0, 2)
+    assert game.is_path_clear('a2', 'a6', 0, 4)
+    assert not game.is_path_clear('d1', 'h5')
+    assert game.is_path_clear('b1', 'c3')
@@ -0,0 +1,28 @@
+import pytest
+from chess.perft import POSITIONS, position, perft, divide, main
+
+# Known node counts at shallow depths; deeper ones are left to 'python -m chess.perft'
+SHALLOW = [(name, depth) for name in POSITIONS for depth in (1, 2)] + [('start', 3), ('endgame', 3)]
+
+@pytest.mark.parametrize('name, depth', SHALLOW)
+@pytest.mark.parametrize('bitboards', [False, True])
+def test_perft_counts(name, depth, bitboards):
+    assert perft(position(name, bitboards), depth) == POSITIONS[name][1][depth]
+
+def test_divide_sums_to_perft():
+    results = divide(position('kiwipete'), 2)
+    assert len(results) == 48
+    assert ('e1g1', 43) in results
+    assert sum(count for _, count in results) == 2039
+
+def test_perft_leaves_game_unchanged():
+    game = position('talkchess')
+    key = game.position_key
+    perft(game, 2)
+    assert game.position_key == key and not game.move_history
+
+def test_main_reports_nodes(capsys):
+    assert main(['--position', 'start', '--depth', '2', '--divide']) == 0
+    output = capsys.readouterr().out
+    assert 'e2e4: 20' in output
+    assert 'nodes: 400' in output
@@ -0,0 +1,60 @@
+import io
+import pytest
+from chess.model import Game
+from chess.pgn import read_games, san_to_move
+
+PGN = '''[Event "Paris"]
+[White "Paul Morphy"]
+[Black "Duke Karl / Count Isouard"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7
+8. Nc3 c6 9. Bg5 b5 10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7
+14. Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8 17. Rd8# 1-0
+
+[Event "Annotated"]
+[Result "*"]
+
+1. e4 {best by test,
+  or so they say} e5 (1... c5 2. Nf3 (2. c3) d6) 2. Nf3 $1 Nc6 ; Italian next
+3.Bc4 *
+
+[Event "Promotion"]
+[SetUp "1"]
+[FEN "4k3/1P6/8/8/8/8/8/4K3 w - - 0 1"]
+[Result "*"]
+
+1. b8=Q+ Kd7 *
+'''
+
+def test_headers_without_replay():
+    games = list(read_games(io.StringIO(PGN)))
+    assert [game.headers['Event'] for game in games] == ['Paris', 'Annotated', 'Promotion']
+    assert games[0].headers['Black'] == 'Duke Karl / Count Isouard'
+    assert games[0].result == '1-0'
+
+def test_replay_to_checkmate():
+    game = next(read_games(io.StringIO(PGN)))
+    moves = list(game.moves())
+    assert len(moves) == 33
+    assert moves[:3] == ['e2e4', 'e7e5', 'g1f3']
+    assert moves[21] == 'b8d7' and moves[22] == 'e1c1'
+    assert game.replay().is_checkmate(False)
+
+def test_comments_and_variations_are_skipped():
+    game = list(read_games(io.StringIO(PGN)))[1]
+    assert list(game.san_moves()) == ['e4', 'e5', 'Nf3', 'Nc6', 'Bc4']
+    assert list(game.moves())[-1] == 'f1c4'
+
+def test_fen_header_and_promotion():
+    game = list(read_games(io.StringIO(PGN)))[2]
+    assert list(game.moves()) == ['b7b8q', 'e8d7']
+
+def test_san_to_move():
+    game = Game.from_fen('4k3/8/8/3pP3/8/8/1N3N2/4K3 w - d6 0 1')
+    assert san_to_move(game, 'exd6') == 'e5d6'
+    assert san_to_move(game, 'Nbd3') == 'b2d3'
+    with pytest.raises(ValueError):
+        san_to_move(game, 'Nd3')
+    with pytest.raises(ValueError):
+        san_to_move(game, 'Qd3')
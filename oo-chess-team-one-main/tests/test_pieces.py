@@ -1,4 +1,5 @@
-from chess.model import Pawn
+import pytest
+from chess.model import Board, Game, Pawn, Knight, Bishop, Rook, Queen, King, square, square_name
 
 # Ensure that pieces are equal if they are the same color and type and not otherwise
 def test_identity():
@@ -7,3 +8,57 @@ def test_identity():
     pawn3 = Pawn(is_white=False)
     assert pawn1 == pawn2
     assert not pawn1 == pawn3
+
+def destinations(piece, board, location, ep_square=None):
+    return sorted(square_name(sq) for sq in piece.destinations(board, square(location), ep_square))
+
+# Ensure that leapers use their offset tables and stay on the board
+def test_knight_and_king_destinations():
+    board = Board()
+    assert destinations(Knight(is_white=True), board, 'a1') == ['b3', 'c2']
+    assert len(destinations(King(is_white=True), board, 'e4')) == 8
+
+# Ensure that sliders stop at the first piece, including it only if it is an enemy
+def test_slider_destinations():
+    board = Board()
+    board.set('a4', Pawn(is_white=True))
+    board.set('d1', Pawn(is_white=False))
+    assert destinations(Rook(is_white=True), board, 'a1') == ['a2', 'a3', 'b1', 'c1', 'd1']
+    assert len(destinations(Queen(is_white=True), Board(), 'd4')) == 27
+
+# Ensure that pawns push, double push from their starting rank and capture diagonally
+def test_pawn_destinations():
+    board = Board()
+    board.set('d3', Knight(is_white=False))
+    assert destinations(Pawn(is_white=True), board, 'e2') == ['d3', 'e3', 'e4']
+    board.set('e3', Knight(is_white=True))
+    assert destinations(Pawn(is_white=True), board, 'e2') == ['d3']
+    board.set('d5', Pawn(is_white=False))
+    assert destinations(Pawn(is_white=True), board, 'e5', square('d6')) == ['d6', 'e6']
+
+# Ensure that en passant and promotion are played by accept_move
+def test_en_passant_and_promotion():
+    game = Game()
+    game.set_up_pieces()
+    for move in ['e2e4', 'a7a6', 'e4e5', 'd7d5', 'e5d6']:
+        game.accept_move(move)
+    assert game.board.get('d5') is None
+    assert game.board.get('d6') == Pawn(is_white=True)
+
+    game = Game(debug=True)
+    game.board.set('b7', Pawn(is_white=True))
+    game.accept_move('b7b8n')
+    assert game.board.get('b8') == Knight(is_white=True)
+    game.undo_move()
+    assert game.board.get('b7') == Pawn(is_white=True)
+
+def test_pieces_are_shared_and_immutable():
+    import pickle
+    assert Pawn(is_white=True) is Pawn(True) is Pawn(True).copy()
+    assert Pawn(True) is not Pawn(False) and Rook(True) is not Bishop(True)
+    assert pickle.loads(pickle.dumps(Queen(False))) is Queen(False)
+    with pytest.raises(AttributeError):
+        Knight(True)._is_white = False
+    board = Board()
+    board.set('a1', King(True))
+    assert board.get('a1') is King(True)
@@ -0,0 +1,63 @@
+import asyncio
+from chess.server import ChessServer
+
+def test_commands():
+    server = ChessServer()
+    assert server.handle(['NEW']) == 'OK 1'
+    assert server.handle(['MOVE', '1', 'e2e4']) == 'OK ongoing'
+    assert server.handle(['MOVE', '1', 'e2e4']).startswith('ERR Illegal Move')
+    assert server.handle(['UNDO', '1']) == 'OK ongoing'
+    assert server.handle(['UNDO', '1']) == 'ERR No moves to undo.'
+    assert server.handle(['SHOW', '1']) == 'OK ongoing rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+    assert server.handle(['RESIGN', '1']) == 'OK white-resigned'
+    assert server.handle(['MOVE', '1', 'e2e4']) == 'ERR Game is over: white-resigned'
+    assert server.handle(['MOVE', '7', 'e2e4']) == 'ERR No game 7'
+    assert server.handle(['NEW', '7k/8/6K1/8/8/8/8/Q7', 'w', '-', '-']) == 'OK 2'
+    assert server.handle(['MOVE', '2', 'a1a8']) == 'OK checkmate'
+    assert server.handle(['FLY', '2']) == 'ERR Unknown command FLY'
+    assert server.handle(['NEW', '4k3/8/8/8/8/8/8/4K3', 'w', '-', '-', '-1', '1']).startswith('ERR Invalid FEN')
+
+def test_tcp_session_with_a_watcher():
+    async def scenario():
+        server = await ChessServer().start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            player_reader, player = await asyncio.open_connection('127.0.0.1', port)
+            watcher_reader, watcher = await asyncio.open_connection('127.0.0.1', port)
+
+            async def ask(reader, writer, line):
+                writer.write(line.encode() + b'\n')
+                await writer.drain()
+                return (await reader.readline()).decode().strip()
+
+            assert await ask(player_reader, player, 'NEW') == 'OK 1'
+            assert (await ask(watcher_reader, watcher, 'WATCH 1')).startswith('UPDATE 1 ongoing rnbqkbnr/')
+            assert (await watcher_reader.readline()).decode().strip() == 'OK 1'
+            for move in ['f2f3', 'e7e5', 'g2g4']:
+                await ask(player_reader, player, f'MOVE 1 {move}')
+            assert await ask(player_reader, player, 'MOVE 1 d8h4') == 'OK checkmate'
+            updates = [(await watcher_reader.readline()).decode().split()[2] for _ in range(4)]
+            assert updates == ['ongoing', 'ongoing', 'ongoing', 'checkmate']
+            assert await ask(player_reader, player, 'QUIT') == 'OK bye'
+            for writer in (player, watcher):
+                writer.close()
+                await writer.wait_closed()
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+
+def test_close_and_expiry():
+    server = ChessServer(idle_timeout=100, finished_timeout=10)
+    assert server.handle(['NEW']) == 'OK 1'
+    assert server.handle(['CLOSE', '1']) == 'OK 1'
+    assert '1' not in server.sessions
+    assert server.handle(['SHOW', '1']) == 'ERR No game 1'
+
+    server.handle(['NEW'])
+    server.handle(['NEW'])
+    server.handle(['RESIGN', '3'])
+    now = server.sessions['3'].last_used
+    # the finished game goes first, the idle one later
+    assert server.expire(now + 50) == ['3']
+    assert list(server.sessions) == ['2']
+    assert server.expire(now + 50) == []
+    assert server.expire(now + 200) == ['2']
+    assert not server.sessions
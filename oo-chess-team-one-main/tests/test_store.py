@@ -0,0 +1,64 @@
+import pytest
+from chess.model import Game, POSITION_SIZE
+from chess.perft import POSITIONS, position
+from chess.store import PositionStore
+
+@pytest.mark.parametrize('name', sorted(POSITIONS))
+def test_encoding_round_trip(name):
+    game = position(name)
+    data = game.to_bytes()
+    assert len(data) == POSITION_SIZE
+    copy = Game.from_bytes(data)
+    assert copy.to_fen() == game.to_fen()
+    assert copy.position_key == game.position_key
+    assert Game.from_bytes(data, bitboards=True).to_fen() == game.to_fen()
+
+def test_en_passant_and_clocks():
+    game = Game.from_fen('4k3/8/8/8/3pP3/8/8/4K3 b - e3 12 40')
+    assert Game.from_bytes(game.to_bytes()).to_fen() == '4k3/8/8/8/3pP3/8/8/4K3 b - e3 12 40'
+
+def test_store(tmp_path):
+    path = tmp_path / 'positions.bin'
+    names = sorted(POSITIONS)
+    with PositionStore(path) as store:
+        for name in names:
+            store.append(position(name))
+        assert len(store) == len(names)
+        assert store[2].to_fen() == position(names[2]).to_fen()
+        # appending after reading maps the new records too
+        assert store.append(Game.from_fen('8/8/8/8/8/8/8/K6k b - - 0 1')) == len(names)
+        assert store[-1].to_fen() == '8/8/8/8/8/8/8/K6k b - - 0 1'
+
+    with PositionStore(path, readonly=True) as store:
+        assert len(store) == len(names) + 1
+        with store.record(0) as record:
+            assert bytes(record) == position(names[0]).to_bytes()
+        assert [game.to_fen() for game in store][:len(names)] == [position(name).to_fen() for name in names]
+        with pytest.raises(IndexError):
+            store.record(len(names) + 1)
+        with pytest.raises(ValueError):
+            store.append(Game())
+
+def test_not_a_store(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'hello world')
+    with pytest.raises(ValueError):
+        PositionStore(path)
+
+def test_partial_record_is_cut_off(tmp_path):
+    path = tmp_path / 'positions.bin'
+    with PositionStore(path) as store:
+        store.append(position('start'))
+    with open(path, 'ab') as f:
+        f.write(b'\x12\x34')
+    with PositionStore(path, readonly=True) as store:
+        assert len(store) == 1
+    with PositionStore(path) as store:
+        store.append(position('kiwipete'))
+        assert store[1].to_fen() == position('kiwipete').to_fen()
+    assert path.stat().st_size == 8 + 2 * POSITION_SIZE
+
+@pytest.mark.parametrize('record', [b'\x08' + bytes(35), bytes(32) + b'\x21\x01\x01\x00'])
+def test_bad_record(record):
+    with pytest.raises(ValueError):
+        Game.from_bytes(record)
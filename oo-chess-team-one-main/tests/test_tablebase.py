@@ -0,0 +1,54 @@
+import pytest
+from chess.model import Game
+from chess.tablebase import Probe, Tablebase, Tablebases, generate, parse_signature, signature_of
+
+@pytest.fixture(scope='module')
+def tables(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('tables')
+    tables = {}
+    generate('KQK', directory, tables)
+    return directory, tables
+
+@pytest.mark.parametrize('fen, expected', [
+    ('k7/8/1K6/8/8/8/7Q/8 w - - 0 1', Probe(1, 1)),
+    ('k6Q/8/1K6/8/8/8/8/8 b - - 0 1', Probe(-1, 0)),
+    # stalemate, and a queen left hanging
+    ('k7/8/1Q6/8/8/8/8/K7 b - - 0 1', Probe(0, None)),
+    ('k7/1Q6/8/8/8/8/8/7K b - - 0 1', Probe(0, None)),
+])
+def test_probe(tables, fen, expected):
+    _, tables = tables
+    assert tables['KQK'].probe(Game.from_fen(fen)) == expected
+
+def test_longest_mate(tables):
+    _, tables = tables
+    kqk = tables['KQK']
+    # KQK is won in at most 10 moves
+    assert max(value - 1 for value in kqk.table if value != 255 and value & 1 == 0) == 19
+
+def test_best_moves_mate_in_the_predicted_number_of_plies(tables):
+    directory, _ = tables
+    bases = Tablebases(directory)
+    game = Game.from_fen('8/8/8/3k4/8/8/7Q/K7 w - - 0 1')
+    probe = bases.probe(game)
+    assert probe.wdl == 1
+    for _ in range(probe.dtm):
+        game.accept_move(bases.best_move(game))
+    assert game.is_checkmate(game.white_to_play)
+
+def test_saved_tables(tables):
+    directory, tables = tables
+    assert sorted(path.name for path in directory.iterdir()) == ['KK.tb', 'KQK.tb']
+    loaded = Tablebase.load(directory / 'KQK.tb')
+    assert loaded.table == tables['KQK'].table
+    game = Game.from_fen('4k3/8/8/8/8/8/8/4K3 w - - 0 1')
+    assert Tablebases(directory).probe(game) == Probe(0, None)
+    # castling rights and other material are not covered
+    assert Tablebases(directory).probe(Game.from_fen('4k3/8/8/8/8/8/8/R3K3 w Q - 0 1')) is None
+    assert signature_of(Game.from_fen('4k3/7p/8/8/8/8/8/R3K3 w - - 0 1')) == 'KRKP'
+
+def test_signatures():
+    assert parse_signature('KRKP') == [6, 4, 14, 9]
+    for bad in ['QK', 'KQ', 'KQXK', 'KKK']:
+        with pytest.raises(ValueError):
+            parse_signature(bad)
@@ -0,0 +1,52 @@
+import io
+import pytest
+from chess.model import Game, IllegalMoveError
+from chess.validate import Verdict, validate_game, validate_games, read_jsonl, read_pgn
+
+FOOLS_MATE = ['f2f3', 'e7e5', 'g2g4', 'd8h4']
+
+def test_legal_game():
+    assert validate_game(FOOLS_MATE) == Verdict(True, 4, None, None, 'checkmate')
+    assert validate_game(['e2e4']) == Verdict(True, 1, None, None, 'ongoing')
+
+def test_first_illegal_ply():
+    verdict = validate_game(['e2e4', 'e7e5', 'e1e3', 'a7a6'])
+    assert not verdict.ok
+    assert (verdict.plies, verdict.illegal_ply, verdict.status) == (2, 3, 'ongoing')
+    assert verdict.reason.startswith('Illegal Move')
+
+def test_san_and_fen():
+    assert validate_game(['Kb6', 'Kb8', 'Qh8#'], fen='k7/8/2K5/8/8/8/8/7Q w - - 0 1', san=True).status == 'checkmate'
+    assert validate_game(['e4'], fen='not a fen').status == 'invalid'
+    assert validate_game(['Nf6'], san=True).illegal_ply == 1
+
+def test_accept_move_raises_illegal_move_error():
+    game = Game()
+    game.set_up_pieces()
+    with pytest.raises(IllegalMoveError):
+        game.accept_move('e2e5')
+    with pytest.raises(IllegalMoveError):
+        game.accept_move(None)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_pipeline_keeps_order(workers):
+    tasks = [(FOOLS_MATE[:n], None, False) for n in range(5)] * 10 + [(['e2e5'], None, False)]
+    verdicts = list(validate_games(tasks, workers=workers, chunksize=3, max_pending=2))
+    assert [verdict.plies for verdict in verdicts] == [0, 1, 2, 3, 4] * 10 + [0]
+    assert verdicts[-1].illegal_ply == 1
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bad_records_get_an_invalid_verdict(workers):
+    lines = io.StringIO('["e2e4"]\n{"moves": [\n42\n{"moves": [1], "san": true}\n'
+                        '{"moves": ["e2e4"], "fen": "4k3/8/8/8/8/8/8/4K3 w - - -1 1"}\n'
+                        '{"moves": 5}\n["e2e4", "e7e5"]\n')
+    verdicts = list(validate_games(read_jsonl(lines), workers=workers, chunksize=2))
+    assert [verdict.status for verdict in verdicts] == ['ongoing'] + ['invalid'] * 5 + ['ongoing']
+    assert verdicts[1].reason.startswith('bad JSON')
+    assert (verdicts[3].plies, verdicts[3].illegal_ply) == (0, 1)
+
+def test_readers():
+    lines = io.StringIO('["e2e4", "e7e5"]\n\n{"moves": ["Nf3"], "san": true}\n')
+    assert list(read_jsonl(lines)) == [(['e2e4', 'e7e5'], None, False), (['Nf3'], None, True)]
+    games = io.StringIO('[Event "x"]\n\n1. e4 e5 *\n')
+    assert list(read_pgn(games)) == [(['e4', 'e5'], None, True)]
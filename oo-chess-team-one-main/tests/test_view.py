@@ -6,3 +6,49 @@ def test_piece_to_char():
     assert ' ' == view.piece_to_char(None)
     assert '♙' == view.piece_to_char(model.Pawn(is_white=True))
     assert '♟' == view.piece_to_char(model.Pawn(is_white=False))
+
+def test_board_to_text():
+    game = model.Game()
+    game.set_up_pieces()
+    lines = view.board_to_text(game.board).splitlines()
+    assert len(lines) == view.BOARD_HEIGHT
+    assert lines[2] == '8 | ♜ | ♞ | ♝ | ♛ | ♚ | ♝ | ♞ | ♜ |'
+    assert lines[12] == '3 |   |   |   |   |   |   |   |   |'
+    assert lines[14] == '2 | ♙ | ♙ | ♙ | ♙ | ♙ | ♙ | ♙ | ♙ |'
+
+def test_renderer_redraws_only_changed_squares():
+    game = model.Game()
+    game.set_up_pieces()
+    renderer = view.BoardRenderer(top=3, left=5)
+    first = renderer.render(game.board)
+    assert first.startswith('\x1b[3;5H    a') and first.count('\x1b[') == view.BOARD_HEIGHT
+    assert renderer.render(game.board) == ''
+    game.accept_move('e2e4')
+    # e4 is drawn on line 3 + 10, e2 on line 3 + 14, both in column 5 + 20
+    assert renderer.render(game.board) == '\x1b[17;25H \x1b[13;25H♙'
+    renderer.reset()
+    assert renderer.render(game.board).count('\x1b[') == view.BOARD_HEIGHT
+
+def test_grid_writes_once_per_frame():
+    class Out:
+        def __init__(self):
+            self.writes = []
+        def write(self, text):
+            self.writes.append(text)
+        def flush(self):
+            pass
+    games = [model.Game() for _ in range(3)]
+    for game in games:
+        game.set_up_pieces()
+    out = Out()
+    grid = view.BoardGrid(columns=2, out=out)
+    grid.draw([game.board for game in games])
+    assert len(out.writes) == 1
+    # the third board starts the second row of the grid
+    assert f'\x1b[{view.BOARD_HEIGHT + 2};1H    a' in out.writes[0]
+    grid.draw([game.board for game in games])
+    assert len(out.writes) == 1
+    games[1].accept_move('g1f3')
+    grid.draw([game.board for game in games])
+    assert f'\x1b[13;{view.BOARD_WIDTH + 3 + 24}H♘' in out.writes[1]
+    assert out.writes[1].count('\x1b[') == 3
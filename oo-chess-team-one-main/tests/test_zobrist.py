@@ -0,0 +1,36 @@
+from chess.model import Game, Board, Knight
+
+def play(moves):
+    game = Game()
+    game.set_up_pieces()
+    for move in moves:
+        game.accept_move(move)
+    return game
+
+# Ensure that the same position reached by different move orders has the same key
+def test_transposition_same_key():
+    assert play(['g1f3', 'g8f6', 'b1c3']).position_key == play(['b1c3', 'g8f6', 'g1f3']).position_key
+
+# Ensure that side to move and castling rights are part of the key
+def test_side_and_castling_change_key():
+    game = play(['g1f3', 'g8f6', 'f3g1', 'f6g8'])
+    assert game.position_key == play([]).position_key
+    assert play(['g1f3', 'g8f6', 'f3g1']).position_key != play(['g1f3']).position_key
+    moved_rook = play(['h2h4', 'h7h5', 'h1h3', 'h8h6', 'h3h1', 'h6h8'])
+    assert moved_rook.board.zobrist == play(['h2h4', 'h7h5']).board.zobrist
+    assert moved_rook.position_key != play(['h2h4', 'h7h5']).position_key
+
+# Ensure that the board key follows set/remove and undo restores the key
+def test_board_key_incremental():
+    board = Board()
+    empty = board.zobrist
+    board.set('e4', Knight(is_white=True))
+    assert board.zobrist != empty
+    board.remove('e4')
+    assert board.zobrist == empty
+
+    game = play(['e2e4'])
+    key = game.position_key
+    game.accept_move('d7d5')
+    game.undo_move()
+    assert game.position_key == key